@@ -1,11 +1,13 @@
+import itertools
 import os
 import re
 from datetime import datetime
 
 import streamlit as st
 
-from config import load_whitelist
-from services.gemini_summarizer import search_and_summarize
+from config import get_whitelist
+from services.gemini_summarizer import search_and_summarize_stream
+from services.workers import BusyError
 
 # --- Page config ---
 st.set_page_config(
@@ -468,6 +470,63 @@ def render_source_card_html(idx: int, source: dict) -> str:
     """
 
 
+ANSWER_HEADER_HTML = """
+<div class="section-header">
+    <span class="icon">📖</span>
+    <span class="label">Answer</span>
+    <span class="line"></span>
+</div>
+"""
+
+SOURCES_HEADER_HTML = """
+<div class="section-header">
+    <span class="icon">📚</span>
+    <span class="label">Where I Found This</span>
+    <span class="line"></span>
+</div>
+"""
+
+
+def render_summary_card_html(summary: str, sources: list[dict]) -> str:
+    """Wrap the (possibly partial) answer in its card."""
+    return f'<div class="summary-card">{build_summary_html(summary, sources)}</div>'
+
+
+def render_sources_html(sources: list[dict]) -> str:
+    """Build the "Where I Found This" header and all source cards."""
+    cards_html = "".join(
+        render_source_card_html(i, src) for i, src in enumerate(sources, 1)
+    )
+    return SOURCES_HEADER_HTML + cards_html
+
+
+def stream_search(query: str) -> dict:
+    """Run a search, drawing source cards and the answer while it is being written."""
+    events = search_and_summarize_stream(query)
+    with st.spinner("Searching safe sites for you..."):
+        first_event = next(events)
+
+    col_answer, col_sources = st.columns([3, 2], gap="large")
+    with col_answer:
+        st.markdown(ANSWER_HEADER_HTML, unsafe_allow_html=True)
+        answer_slot = st.empty()
+    with col_sources:
+        sources_slot = st.empty()
+
+    summary = ""
+    sources: list[dict] = []
+    for kind, payload in itertools.chain([first_event], events):
+        if kind == "sources":
+            sources = payload
+            sources_slot.markdown(render_sources_html(sources), unsafe_allow_html=True)
+        elif kind == "chunk":
+            summary += payload
+            answer_slot.markdown(render_summary_card_html(summary, sources), unsafe_allow_html=True)
+        elif kind == "done":
+            return payload
+    raise RuntimeError("search ended without a result")
+
+
 # --- Sidebar: Search History ---
 with st.sidebar:
     st.markdown('<div class="sidebar-title">&#128336; Search History</div>', unsafe_allow_html=True)
@@ -497,7 +556,7 @@ with st.sidebar:
             st.rerun()
 
 # --- Header ---
-_all_sites = load_whitelist()
+_all_sites = get_whitelist().sites
 _badges_html = "\n".join(
     f'        <span class="hero-badge">{s["name"]}</span>' for s in _all_sites
 )
@@ -524,23 +583,24 @@ with _search_col:
 
 # --- Search logic ---
 if search_clicked and query.strip():
-    with st.spinner("Searching safe sites for you..."):
-        try:
-            result = search_and_summarize(query.strip())
-            entry = {
-                "query": query.strip(),
-                "summary": result["summary"],
-                "sources": result["sources"],
-                "timestamp": datetime.now().strftime("%I:%M %p"),
-            }
-            # Save to history (limit to 20)
-            st.session_state.search_history.append(entry)
-            if len(st.session_state.search_history) > 20:
-                st.session_state.search_history = st.session_state.search_history[-20:]
-            st.session_state.active_result = entry
-            st.rerun()
-        except Exception as e:
-            st.error(f"Oops! Something went wrong. Please try again! ({e})")
+    try:
+        result = stream_search(query.strip())
+        entry = {
+            "query": query.strip(),
+            "summary": result["summary"],
+            "sources": result["sources"],
+            "timestamp": datetime.now().strftime("%I:%M %p"),
+        }
+        # Save to history (limit to 20)
+        st.session_state.search_history.append(entry)
+        if len(st.session_state.search_history) > 20:
+            st.session_state.search_history = st.session_state.search_history[-20:]
+        st.session_state.active_result = entry
+        st.rerun()
+    except BusyError:
+        st.info("Lots of kids are searching right now! Wait a few seconds and press Search! again.")
+    except Exception as e:
+        st.error(f"Oops! Something went wrong. Please try again! ({e})")
 
 elif search_clicked:
     st.warning("Please type a question first!")
@@ -553,34 +613,12 @@ if st.session_state.active_result:
     col_answer, col_sources = st.columns([3, 2], gap="large")
 
     with col_answer:
-        st.markdown("""
-        <div class="section-header">
-            <span class="icon">📖</span>
-            <span class="label">Answer</span>
-            <span class="line"></span>
-        </div>
-        """, unsafe_allow_html=True)
-
-        summary_html = build_summary_html(active["summary"], sources)
-        st.markdown(
-            f'<div class="summary-card">{summary_html}</div>',
-            unsafe_allow_html=True,
-        )
+        st.markdown(ANSWER_HEADER_HTML, unsafe_allow_html=True)
+        st.markdown(render_summary_card_html(active["summary"], sources), unsafe_allow_html=True)
 
     with col_sources:
         if sources:
-            st.markdown("""
-            <div class="section-header">
-                <span class="icon">📚</span>
-                <span class="label">Where I Found This</span>
-                <span class="line"></span>
-            </div>
-            """, unsafe_allow_html=True)
-
-            cards_html = "".join(
-                render_source_card_html(i, src) for i, src in enumerate(sources, 1)
-            )
-            st.markdown(cards_html, unsafe_allow_html=True)
+            st.markdown(render_sources_html(sources), unsafe_allow_html=True)
 
 # --- Footer ---
 st.markdown("""
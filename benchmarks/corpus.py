@@ -0,0 +1,44 @@
+"""Recorded HTML corpus shared by the benchmarks.
+
+Layout (under benchmarks/corpus/ by default, git-ignored):
+    index.json       [{"url": ..., "file": ..., "content_type": ...}, ...]
+    pages/<sha1>.html
+"""
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_CORPUS = Path(__file__).resolve().parent / "corpus"
+
+# Let benchmark scripts import the app's modules when run as files
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def load_index(corpus: Path = DEFAULT_CORPUS) -> list[dict]:
+    index_path = corpus / "index.json"
+    if not index_path.exists():
+        return []
+    return json.loads(index_path.read_text(encoding="utf-8"))
+
+
+def load_pages(corpus: Path = DEFAULT_CORPUS) -> list[tuple[str, str]]:
+    """Return (url, html) for every recorded page."""
+    return [
+        (entry["url"], (corpus / entry["file"]).read_text(encoding="utf-8", errors="replace"))
+        for entry in load_index(corpus)
+    ]
+
+
+def save_page(url: str, html: str, content_type: str = "text/html; charset=utf-8",
+              corpus: Path = DEFAULT_CORPUS):
+    """Add or replace a page in the corpus."""
+    name = f"pages/{hashlib.sha1(url.encode()).hexdigest()}.html"
+    (corpus / "pages").mkdir(parents=True, exist_ok=True)
+    (corpus / name).write_text(html, encoding="utf-8")
+
+    index = [e for e in load_index(corpus) if e["url"] != url]
+    index.append({"url": url, "file": name, "content_type": content_type})
+    (corpus / "index.json").write_text(json.dumps(index, indent=2), encoding="utf-8")
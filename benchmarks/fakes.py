@@ -0,0 +1,163 @@
+"""Offline stand-ins for DuckDuckGo and Gemini, with configurable latency.
+
+FakeDDGS answers `site:` queries from the recorded corpus (BM25 over each
+page's title and text), and FakeGeminiClient answers the pipeline's ranking,
+answer and source-summary prompts with canned text. Both sleep for a
+latency drawn from a Latency distribution before answering.
+"""
+import asyncio
+import math
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+from ddgs.exceptions import DDGSException
+
+from services.lexical_ranker import bm25_scores
+
+
+class Latency:
+    """Log-normal latency given its median and p95 in seconds (both 0 means none)."""
+
+    def __init__(self, median: float, p95: float | None = None, seed: int = 0):
+        self.median = median
+        p95 = median if p95 is None else max(p95, median)
+        self.sigma = math.log(p95 / median) / 1.645 if median > 0 else 0.0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: int = 0) -> "Latency":
+        """Build from "MEDIAN" or "MEDIAN,P95" (seconds), as given on the command line."""
+        parts = [float(p) for p in spec.split(",")]
+        return cls(parts[0], parts[1] if len(parts) > 1 else None, seed)
+
+    def sample(self) -> float:
+        if self.median <= 0:
+            return 0.0
+        with self._lock:
+            return self.median * math.exp(self._rng.gauss(0.0, self.sigma))
+
+    def sleep(self):
+        time.sleep(self.sample())
+
+    async def asleep(self):
+        await asyncio.sleep(self.sample())
+
+
+class SearchIndex:
+    """The corpus pages as search hits: url, title and a snippet, by bare domain."""
+
+    def __init__(self, pages: list[dict]):
+        self.pages = pages
+
+    def search(self, query: str, domains: list[str], max_results: int) -> list[dict]:
+        hits = [p for p in self.pages if _bare_host(p["url"]) in domains]
+        scores = bm25_scores(query, [f"{p['title']} {p['snippet']}" for p in hits])
+        ranked = sorted(zip(scores, range(len(hits))), key=lambda item: -item[0])
+        return [
+            {"title": hits[i]["title"], "href": hits[i]["url"], "body": hits[i]["snippet"]}
+            for score, i in ranked[:max_results] if score > 0
+        ]
+
+
+def fake_ddgs(index: SearchIndex, latency: Latency):
+    """A DDGS class whose text() searches index instead of DuckDuckGo."""
+
+    class FakeDDGS:
+        def __init__(self, *args, timeout: int | None = 5, **kwargs):
+            self.timeout = timeout
+
+        def text(self, query: str, max_results: int = 10, **kwargs) -> list[dict]:
+            delay = latency.sample()
+            if self.timeout and delay > self.timeout:
+                time.sleep(self.timeout)
+                raise DDGSException("timed out")
+            time.sleep(delay)
+            domains = re.findall(r"site:(\S+)", query)
+            terms = re.sub(r"\bOR\b|site:\S+", " ", query)
+            results = index.search(terms, domains, max_results)
+            if not results:
+                # Same as ddgs when nothing matches
+                raise DDGSException("No results found.")
+            return results
+
+    return FakeDDGS
+
+
+class _Response:
+    def __init__(self, text: str, prompt: str | None = None, reply: str = ""):
+        """prompt (with the whole reply) is given on the response that reports token usage."""
+        self.text = text
+        self.usage_metadata = None if prompt is None else SimpleNamespace(
+            prompt_token_count=len(prompt) // 4,
+            candidates_token_count=len(reply) // 4,
+            thoughts_token_count=0,
+        )
+
+
+class _Models:
+    def __init__(self, latency: Latency, chunks: int):
+        self.latency = latency
+        self.chunks = chunks
+
+    def generate_content(self, model: str, contents: str, config=None) -> _Response:
+        self.latency.sleep()
+        reply = canned_reply(contents)
+        return _Response(reply, contents, reply)
+
+    def generate_content_stream(self, model: str, contents: str, config=None):
+        text = canned_reply(contents)
+        step = max(1, len(text) // self.chunks)
+        # Time to first chunk is most of the latency; the rest trickles out
+        first = self.latency.sample()
+        time.sleep(first * 0.5)
+        for start in range(0, len(text), step):
+            time.sleep(first * 0.5 / self.chunks)
+            last = start + step >= len(text)
+            yield _Response(text[start:start + step], contents if last else None, text)
+
+
+class _AsyncModels:
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    async def generate_content(self, model: str, contents: str, config=None) -> _Response:
+        await self.latency.asleep()
+        reply = canned_reply(contents)
+        return _Response(reply, contents, reply)
+
+
+class FakeGeminiClient:
+    """Stands in for genai.Client: .models and .aio.models answer with canned_reply()."""
+
+    def __init__(self, latency: Latency, stream_chunks: int = 20):
+        self.models = _Models(latency, stream_chunks)
+        self.aio = type("_Aio", (), {"models": _AsyncModels(latency)})()
+
+
+def canned_reply(prompt: str) -> str:
+    """A plausible reply to each of the pipeline's prompts."""
+    sources = sorted({int(n) for n in re.findall(r"^\[(\d+)\] ", prompt, re.MULTILINE)})
+    if "Output ONLY numbers" in prompt:
+        return "\n".join(str(n) for n in sources[:5])
+    if "Using ONLY the sources above" in prompt:
+        sentences = [
+            f"This is sentence {n} of a kid-friendly answer, explained with a simple example [{n}]."
+            for n in sources
+        ]
+        reply = " ".join(sentences * 3)
+        if "===SOURCE SUMMARIES===" in prompt:
+            reply += "\n===SOURCE SUMMARIES===\n" + "\n".join(
+                f"[{n}] This source explained one of the key facts used in the answer." for n in sources
+            )
+        return reply
+    # Separate source-summary prompt
+    return "\n".join(f"[{n}] This source explained one of the key facts used in the answer." for n in sources)
+
+
+def _bare_host(url: str) -> str:
+    return urlparse(url).netloc.lower().removeprefix("www.")
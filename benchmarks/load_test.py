@@ -0,0 +1,232 @@
+"""Simulate concurrent kid sessions, offline, and report where one process stops scaling.
+
+    python benchmarks/load_test.py [--users 1,2,4,8,16] [--queries-per-user 3]
+        [--target pipeline|app] [--think 2,6]
+
+Each step of the ramp starts that many sessions at once. Every session asks
+its questions one after another, pausing for a think time in between.
+--target pipeline calls search_and_summarize directly from one thread per
+session. --target app runs app.py through Streamlit's AppTest harness (type
+the question, press Search!); AppTest keeps process-global state, so each
+app session gets its own worker process and the resource columns add up
+the whole process tree. DuckDuckGo, Gemini and the whitelisted
+sites are the offline stand-ins from pipeline_benchmark.py, with the same
+latency options.
+
+For each step it reports throughput, latency percentiles, errors and the
+peak thread count, open sockets and RSS seen while the step ran.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from corpus import DEFAULT_CORPUS, ROOT, load_pages
+from fakes import Latency
+from pipeline_benchmark import DEFAULT_QUERIES, install_fakes, percentile
+
+from services import answer_cache, web_searcher
+from services.gemini_summarizer import search_and_summarize
+
+APP_PATH = ROOT / "app.py"
+
+
+class PipelineSession:
+    def ask(self, query: str):
+        search_and_summarize(query)
+
+
+class AppSession:
+    """One browser tab: an AppTest of app.py that keeps its session state between questions."""
+
+    def __init__(self, timeout: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+        self.at.run()
+        password = os.environ.get("APP_PASSWORD", "")
+        if password:
+            self.at.text_input[0].input(password)
+            self.at.button[0].click().run()
+        self._check()
+
+    def ask(self, query: str):
+        next(t for t in self.at.text_input if t.label == "Your question").input(query)
+        next(b for b in self.at.button if b.label == "Search!").click().run()
+        self._check()
+
+    def _check(self):
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].message)
+        if self.at.error:
+            raise RuntimeError(self.at.error[0].value)
+
+
+def run_session(target: str, args, queries: list[str], seed: int) -> dict:
+    """Ask one session's questions in turn; returns its latencies, errors and active period."""
+    rng = random.Random(seed)
+    think = Latency.parse(args.think, seed)
+    outcome = {"latencies": [], "errors": [], "start": time.time(), "end": time.time()}
+    try:
+        session = AppSession(args.timeout) if target == "app" else PipelineSession()
+    except Exception as e:
+        outcome["errors"].append(repr(e))
+        return outcome
+    outcome["start"] = time.time()
+    for i in range(args.queries_per_user):
+        if i:
+            think.sleep()
+        start = time.perf_counter()
+        try:
+            session.ask(rng.choice(queries))
+        except Exception as e:
+            outcome["errors"].append(repr(e))
+            continue
+        outcome["latencies"].append(time.perf_counter() - start)
+    outcome["end"] = time.time()
+    return outcome
+
+
+def _app_session_process(args, port: int, queries: list[str], seed: int) -> dict:
+    """Worker process for one app session (AppTest keeps process-global state)."""
+    install_fakes(args, load_pages(args.corpus), port)
+    disable_caches(args)
+    return run_session("app", args, queries, seed)
+
+
+def disable_caches(args):
+    if not args.warm:
+        # Sessions would otherwise mostly be served each other's cached answers
+        answer_cache._memory.max_entries = 0
+        web_searcher._cache.max_entries = 0
+
+
+class ResourceSampler:
+    """Polls threads, open sockets and RSS of this process and its children, keeping the peaks."""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.threads = self.sockets = self.rss = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+
+    def __enter__(self) -> "ResourceSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            threads, sockets, rss = process_tree_usage()
+            # Don't count the sampler itself
+            self.threads = max(self.threads, threads - 1)
+            self.sockets = max(self.sockets, sockets)
+            self.rss = max(self.rss, rss)
+            if self._stop.wait(self.interval):
+                return
+
+
+def process_tree_usage() -> tuple[int, int, int]:
+    """(threads, open sockets, RSS bytes) summed over this process and its descendants.
+
+    Needs /proc; elsewhere only this process's Python threads and peak RSS are reported.
+    """
+    if not os.path.isdir("/proc/self/task"):
+        import resource
+        return threading.active_count(), 0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    threads = sockets = rss = 0
+    pending = [str(os.getpid())]
+    while pending:
+        pid = pending.pop()
+        try:
+            tasks = os.listdir(f"/proc/{pid}/task")
+            with open(f"/proc/{pid}/statm") as f:
+                rss += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            fds = os.listdir(f"/proc/{pid}/fd")
+        except OSError:
+            continue  # exited meanwhile
+        threads += len(tasks)
+        for fd in fds:
+            try:
+                sockets += os.readlink(f"/proc/{pid}/fd/{fd}").startswith("socket:")
+            except OSError:
+                pass
+        for tid in tasks:
+            try:
+                with open(f"/proc/{pid}/task/{tid}/children") as f:
+                    pending += f.read().split()
+            except OSError:
+                pass
+    return threads, sockets, rss
+
+
+def run_step(users: int, args, queries: list[str], port: int) -> dict:
+    seeds = [args.seed * 1000 + users * 100 + n for n in range(users)]
+    with ResourceSampler() as sampler:
+        if args.target == "app":
+            spawn = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=users, mp_context=spawn) as pool:
+                outcomes = list(pool.map(
+                    _app_session_process, [args] * users, [port] * users, [queries] * users, seeds
+                ))
+        else:
+            with ThreadPoolExecutor(max_workers=users, thread_name_prefix="session") as pool:
+                outcomes = list(pool.map(lambda seed: run_session("pipeline", args, queries, seed), seeds))
+
+    return {
+        "latencies": [lat for o in outcomes for lat in o["latencies"]],
+        "errors": [e for o in outcomes for e in o["errors"]],
+        # From the first question asked to the last answer, leaving out session start-up
+        "elapsed": max(o["end"] for o in outcomes) - min(o["start"] for o in outcomes),
+        "threads": sampler.threads, "sockets": sampler.sockets, "rss": sampler.rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="1,2,4,8,16", help="concurrent sessions per ramp step")
+    parser.add_argument("--queries-per-user", type=int, default=3)
+    parser.add_argument("--target", choices=("pipeline", "app"), default="pipeline")
+    parser.add_argument("--think", default="2,6", help="pause between a session's questions (median,p95 s)")
+    parser.add_argument("--timeout", type=float, default=120, help="AppTest run timeout (s)")
+    parser.add_argument("-q", "--query", action="append", default=[], help="question pool (repeatable)")
+    parser.add_argument("--warm", action="store_true", help="keep the answer and search caches on")
+    parser.add_argument("--ddgs-latency", default="0.8,2.5")
+    parser.add_argument("--gemini-latency", default="2,6")
+    parser.add_argument("--page-latency", default="0.15,0.6")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    args = parser.parse_args()
+
+    pages = load_pages(args.corpus)
+    if not pages:
+        raise SystemExit(f"No pages in {args.corpus}; run benchmarks/record_corpus.py first.")
+    server = install_fakes(args, pages)
+    disable_caches(args)
+    queries = args.query or DEFAULT_QUERIES
+
+    print(f"target={args.target}, {args.queries_per_user} questions per session, think {args.think}s "
+          f"(ddgs {args.ddgs_latency}s, gemini {args.gemini_latency}s, pages {args.page_latency}s)\n")
+    print(f"{'users':>5} {'done':>5} {'errors':>6} {'q/s':>6} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} "
+          f"{'threads':>7} {'sockets':>7} {'RSS MB':>7}")
+    for users in [int(u) for u in args.users.split(",")]:
+        step = run_step(users, args, queries, server.port)
+        lat = step["latencies"]
+        pcts = " ".join(f"{percentile(lat, q):7.2f}" if lat else f"{'-':>7}" for q in (0.5, 0.95, 0.99))
+        throughput = len(lat) / step["elapsed"] if step["elapsed"] > 0 else 0.0
+        print(f"{users:5d} {len(lat):5d} {len(step['errors']):6d} {throughput:6.2f} {pcts} "
+              f"{step['threads']:7d} {step['sockets']:7d} {step['rss'] / 1e6:7.1f}")
+        for error in sorted(set(step["errors"]))[:3]:
+            print(f"      e.g. {error}")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
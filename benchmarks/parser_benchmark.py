@@ -0,0 +1,61 @@
+"""Compare HTML parser backends on the recorded corpus.
+
+    python benchmarks/parser_benchmark.py [--repeat 5] [--corpus DIR]
+
+For every backend this times the page extractor over every
+recorded page and checks that the extracted fields match html.parser's.
+"""
+import argparse
+import time
+from pathlib import Path
+
+from corpus import DEFAULT_CORPUS, load_pages
+
+from services.content_extractor import _empty_page, _parse_page
+from services.html_parsers import available_backends
+
+BASELINE = "html.parser"
+
+
+def extract(html: str, url: str, backend: str) -> dict:
+    page = _empty_page(url)
+    _parse_page(html, page, backend)
+    return page
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    args = parser.parse_args()
+
+    pages = load_pages(args.corpus)
+    if not pages:
+        raise SystemExit(f"No pages in {args.corpus}; run benchmarks/record_corpus.py first.")
+    total_bytes = sum(len(html.encode()) for _, html in pages)
+    print(f"{len(pages)} pages, {total_bytes / 1e6:.1f} MB, {args.repeat} repeats\n")
+
+    # Time the baseline first so the others can report a speedup
+    backends = sorted(available_backends(), key=lambda b: b != BASELINE)
+    baseline = {url: extract(html, url, BASELINE) for url, html in pages}
+    timings = {}
+    for backend in backends:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            outputs = {url: extract(html, url, backend) for url, html in pages}
+        timings[backend] = (time.perf_counter() - start) / args.repeat
+
+        mismatches = {}
+        for url, fields in outputs.items():
+            for field, value in fields.items():
+                if value != baseline[url][field]:
+                    mismatches.setdefault(field, []).append(url)
+        per_page_ms = timings[backend] / len(pages) * 1000
+        speedup = timings[BASELINE] / timings[backend] if BASELINE in timings else 1.0
+        print(f"{backend:12} {per_page_ms:8.2f} ms/page  x{speedup:.2f} vs {BASELINE}")
+        for field, urls in sorted(mismatches.items()):
+            print(f"{'':12} {field}: differs on {len(urls)} page(s), e.g. {urls[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Run search_and_summarize end to end, fully offline, and report where the time goes.
+
+    python benchmarks/pipeline_benchmark.py [-q QUERY ...] [--runs 3]
+        [--ddgs-latency 0.8,2.5] [--gemini-latency 2,6] [--page-latency 0.15,0.6]
+
+DuckDuckGo and Gemini are replaced by the stand-ins in fakes.py and every
+page is served from the recorded corpus by replay_server.py, so the numbers
+depend only on this code and the latency distributions (median,p95 in
+seconds). Caches are cleared before every query unless --warm is given.
+
+Reports p50/p95/p99 of the end-to-end latency and of every pipeline stage
+(from the telemetry spans), CPU time per query and peak memory.
+"""
+import argparse
+import math
+import resource
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+from corpus import DEFAULT_CORPUS, load_pages
+from fakes import FakeGeminiClient, Latency, SearchIndex, fake_ddgs
+from replay_server import ReplayServer, ReplayTransport
+
+from services import (
+    answer_cache,
+    article_cache,
+    content_extractor,
+    gemini_summarizer,
+    telemetry,
+    web_searcher,
+)
+
+DEFAULT_QUERIES = [
+    "how do volcanoes work",
+    "why is the sky blue",
+    "what do sharks eat",
+    "who was abraham lincoln",
+    "how do plants make food",
+]
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def build_index(pages: list[tuple[str, str]]) -> SearchIndex:
+    """Search hits for every corpus page, with title and snippet from the real extractor."""
+    hits = []
+    for url, html in pages:
+        page = content_extractor._empty_page(url)
+        content_extractor._parse_page(html, page)
+        hits.append({
+            "url": url,
+            "title": page["title"] or url,
+            "snippet": (page["description"] or page["text"])[:250],
+        })
+    return SearchIndex(hits)
+
+
+def install_fakes(args, pages, port: int | None = None) -> ReplayServer | None:
+    """Swap in the offline stand-ins; starts a replay server unless one is already on port."""
+    # Never read or write the real on-disk caches
+    article_cache.ARTICLE_CACHE_PATH = ""
+    answer_cache.ANSWER_CACHE_PATH = ""
+    web_searcher.DDGS = fake_ddgs(build_index(pages), Latency.parse(args.ddgs_latency, args.seed))
+    gemini_summarizer._client = FakeGeminiClient(Latency.parse(args.gemini_latency, args.seed + 1))
+    server = None
+    if port is None:
+        server = ReplayServer(args.corpus, Latency.parse(args.page_latency, args.seed + 2)).start()
+        port = server.port
+    # Same settings as content_extractor._get_http_client, but every request goes to the replay server
+    content_extractor._http_client = httpx.Client(
+        transport=ReplayTransport(port, limits=content_extractor._client_limits()),
+        headers=content_extractor.HEADERS,
+        timeout=content_extractor.FETCH_TIMEOUT,
+        follow_redirects=True,
+        max_redirects=10,
+    )
+    return server
+
+
+def clear_caches():
+    answer_cache._memory.clear()
+    web_searcher._cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-q", "--query", action="append", default=[], help="query to run (repeatable)")
+    parser.add_argument("--runs", type=int, default=3, help="times to run the whole query list")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed queries before measuring")
+    parser.add_argument("--warm", action="store_true", help="keep caches between queries")
+    parser.add_argument("--deadline", type=float, default=None, help="per-query deadline (default QUERY_DEADLINE)")
+    parser.add_argument("--ddgs-latency", default="0.8,2.5")
+    parser.add_argument("--gemini-latency", default="2,6")
+    parser.add_argument("--page-latency", default="0.15,0.6")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also report the Python heap peak (tracemalloc; slows the run down)")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    args = parser.parse_args()
+
+    pages = load_pages(args.corpus)
+    if not pages:
+        raise SystemExit(f"No pages in {args.corpus}; run benchmarks/record_corpus.py first.")
+    queries = args.query or DEFAULT_QUERIES
+    server = install_fakes(args, pages)
+
+    stages = defaultdict(list)
+    measuring = False
+
+    def _collect(record: dict):
+        if measuring:
+            stages[record["span"]].append(record["ms"] / 1000)
+
+    telemetry.add_listener(_collect)
+
+    for query in (queries * args.warmup)[:args.warmup]:
+        clear_caches()
+        gemini_summarizer.search_and_summarize(query, args.deadline)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    measuring = True
+    wall, cpu, sources = [], [], []
+    for _ in range(args.runs):
+        for query in queries:
+            if not args.warm:
+                clear_caches()
+            cpu_start, start = time.process_time(), time.perf_counter()
+            result = gemini_summarizer.search_and_summarize(query, args.deadline)
+            wall.append(time.perf_counter() - start)
+            cpu.append(time.process_time() - cpu_start)
+            sources.append(len(result["sources"]))
+    measuring = False
+    server.stop()
+
+    print(f"{len(pages)} corpus pages, {len(wall)} queries "
+          f"(ddgs {args.ddgs_latency}s, gemini {args.gemini_latency}s, pages {args.page_latency}s)\n")
+    print(f"{'stage':18} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = [("end-to-end", wall)] + sorted(stages.items())
+    for name, values in rows:
+        print(f"{name:18} {len(values):5d} " + " ".join(
+            f"{percentile(values, q) * 1000:9.1f}" for q in (0.5, 0.95, 0.99)
+        ))
+    print(f"\nCPU time per query: {sum(cpu) / len(cpu) * 1000:.1f} ms "
+          f"(p95 {percentile(cpu, 0.95) * 1000:.1f} ms)")
+    print(f"Sources per answer: {sum(sources) / len(sources):.1f}")
+    print(f"Peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+    if args.trace_memory:
+        print(f"Peak Python heap: {tracemalloc.get_traced_memory()[1] / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
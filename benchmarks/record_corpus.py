@@ -0,0 +1,51 @@
+"""Record whitelisted pages into the benchmark corpus.
+
+    python benchmarks/record_corpus.py                      # every site's home page
+    python benchmarks/record_corpus.py -q "volcanoes" -q "sharks"   # search hits for queries
+    python benchmarks/record_corpus.py https://www.ducksters.com/science/volcanoes.php
+"""
+import argparse
+from pathlib import Path
+
+from corpus import DEFAULT_CORPUS, save_page
+
+import httpx
+
+from config import get_whitelist
+from services.content_extractor import HEADERS
+from services.web_searcher import search_domain, search_whitelisted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("urls", nargs="*", help="extra page URLs to record")
+    parser.add_argument("-q", "--query", action="append", default=[],
+                        help="record the search hits for this query (repeatable)")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    args = parser.parse_args()
+
+    whitelist = get_whitelist()
+    sites = whitelist.sites
+    domains = list(whitelist.domains)
+    urls = list(args.urls)
+    for query in args.query:
+        urls += [r["url"] for r in search_whitelisted(query, domains)]
+        for domain in domains:
+            urls += [r["url"] for r in search_domain(query, domain)]
+    if not urls:
+        urls = [s["url"] for s in sites]
+
+    with httpx.Client(headers=HEADERS, timeout=15.0, follow_redirects=True) as client:
+        for url in dict.fromkeys(urls):
+            try:
+                resp = client.get(url)
+                resp.raise_for_status()
+            except Exception as e:
+                print(f"skip  {url} ({e})")
+                continue
+            save_page(url, resp.text, resp.headers.get("content-type", "text/html"), args.corpus)
+            print(f"saved {url} ({len(resp.content):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Serve the recorded corpus over local HTTP so page fetches run without the internet.
+
+ReplayServer listens on 127.0.0.1 and answers each request from the corpus
+page whose host and path match the request's Host header and path. ReplayTransport
+is an httpx transport that sends every request there, leaving the Host header
+and the original URL untouched, so redirects, cookies and caching behave as
+they would against the real site.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import httpx
+
+from corpus import load_index
+
+
+class ReplayServer:
+    def __init__(self, corpus: Path, latency=None, port: int = 0):
+        """latency (a fakes.Latency) is the delay before each response."""
+        self.pages = {}
+        for entry in load_index(corpus):
+            parts = urlsplit(entry["url"])
+            key = (parts.netloc.lower().removeprefix("www."), parts.path or "/", parts.query)
+            self.pages[key] = (corpus / entry["file"], entry.get("content_type") or "text/html")
+        self.latency = latency
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency.sample())
+                host = self.headers.get("Host", "").lower().removeprefix("www.")
+                parts = urlsplit(self.path)
+                found = server.pages.get((host, parts.path or "/", parts.query))
+                if found is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                path, content_type = found
+                body = path.read_bytes()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "ReplayServer":
+        threading.Thread(target=self._server.serve_forever, name="replay", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """Routes every request to a ReplayServer on 127.0.0.1."""
+
+    def __init__(self, port: int, **transport_kwargs):
+        self.port = port
+        self._inner = httpx.HTTPTransport(**transport_kwargs)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        original = request.url
+        request.url = original.copy_with(scheme="http", host="127.0.0.1", port=self.port)
+        try:
+            response = self._inner.handle_request(request)
+        finally:
+            request.url = original
+        return response
+
+    def close(self):
+        self._inner.close()
@@ -1,7 +1,12 @@
 import json
 import os
+import threading
+import time
 from pathlib import Path
+from types import MappingProxyType
+from urllib.parse import urlparse
 
+import soupsieve
 from dotenv import load_dotenv
 
 load_dotenv(Path(__file__).parent / ".env")
@@ -14,8 +19,166 @@ except Exception:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 
 
-def load_whitelist() -> list[dict]:
-    whitelist_path = Path(__file__).parent / "whitelist.json"
-    with open(whitelist_path, "r", encoding="utf-8") as f:
+WHITELIST_PATH = Path(__file__).parent / "whitelist.json"
+# How often (seconds) get_whitelist() checks whitelist.json's mtime for edits
+WHITELIST_CHECK_INTERVAL = 2.0
+
+
+class Whitelist:
+    """Immutable, precompiled view of whitelist.json.
+
+    URLs are matched by exact host (a leading "www." is ignored, other
+    subdomains are not allowed) with one dict lookup, then checked against
+    the site's path_prefix if it has one.
+    """
+
+    def __init__(self, sites: list[dict]):
+        self.sites = tuple(MappingProxyType(dict(s)) for s in sites)
+        self.domains = tuple(s["domain"] for s in self.sites)
+        self._by_domain = {s["domain"]: s for s in self.sites}
+        self._path_prefixes = {
+            s["domain"]: s["path_prefix"].lower() for s in self.sites if s.get("path_prefix")
+        }
+
+    def site(self, domain: str):
+        """The whitelist entry for a domain, or None."""
+        return self._by_domain.get(domain)
+
+    def match(self, url: str) -> str | None:
+        """The whitelisted domain a URL belongs to, or None if it isn't allowed."""
+        parsed = urlparse(url)
+        domain = parsed.netloc.lower().removeprefix("www.")
+        if domain not in self._by_domain:
+            return None
+        prefix = self._path_prefixes.get(domain)
+        if prefix and not parsed.path.lower().startswith(prefix):
+            return None
+        return domain
+
+
+def _read_whitelist() -> Whitelist:
+    with open(WHITELIST_PATH, "r", encoding="utf-8") as f:
         data = json.load(f)
-    return data["sites"]
+    for site in data["sites"]:
+        _check_extraction(site)
+    return Whitelist(data["sites"])
+
+
+def _check_extraction(site: dict):
+    """Raise ValueError if a site's extraction selectors don't compile."""
+    rules = site.get("extraction") or {}
+    selectors = [rules.get("content"), rules.get("image"), *rules.get("strip", [])]
+    try:
+        for selector in filter(None, selectors):
+            soupsieve.compile(selector)
+    except soupsieve.SelectorSyntaxError as e:
+        raise ValueError(f"Invalid extraction selector for {site.get('name', site['domain'])}: {e}") from e
+
+
+_whitelist = _read_whitelist()
+_whitelist_mtime = WHITELIST_PATH.stat().st_mtime_ns
+_whitelist_checked_at = time.monotonic()
+_whitelist_lock = threading.Lock()
+
+
+def get_whitelist() -> Whitelist:
+    """The current whitelist, reloaded when whitelist.json changes on disk.
+
+    An edit that doesn't parse, or has an extraction selector that doesn't
+    compile, is ignored and the previous whitelist kept.
+    """
+    global _whitelist, _whitelist_mtime, _whitelist_checked_at
+    if time.monotonic() - _whitelist_checked_at < WHITELIST_CHECK_INTERVAL:
+        return _whitelist
+    with _whitelist_lock:
+        if time.monotonic() - _whitelist_checked_at >= WHITELIST_CHECK_INTERVAL:
+            _whitelist_checked_at = time.monotonic()
+            try:
+                mtime = WHITELIST_PATH.stat().st_mtime_ns
+                if mtime != _whitelist_mtime:
+                    _whitelist, _whitelist_mtime = _read_whitelist(), mtime
+            except (OSError, ValueError, KeyError):
+                pass
+    return _whitelist
+
+
+# Persistent article cache (SQLite, WAL mode). Set ARTICLE_CACHE_PATH= to disable.
+ARTICLE_CACHE_PATH = os.getenv(
+    "ARTICLE_CACHE_PATH", str(Path(__file__).parent / ".cache" / "articles.sqlite3")
+)
+# Seconds before a cached article must be revalidated, per whitelist category.
+# Override with e.g. ARTICLE_CACHE_TTL_NEWS=1800.
+ARTICLE_CACHE_TTLS = {
+    category: int(os.getenv(f"ARTICLE_CACHE_TTL_{category.upper()}", default))
+    for category, default in {
+        "news": 60 * 60,
+        "search": 24 * 60 * 60,
+        "research": 7 * 24 * 60 * 60,
+    }.items()
+}
+ARTICLE_CACHE_DEFAULT_TTL = int(os.getenv("ARTICLE_CACHE_DEFAULT_TTL", 24 * 60 * 60))
+
+# Answer cache in front of search_and_summarize: an in-process LRU tier plus
+# an optional SQLite tier shared by every worker (disabled unless a path is set).
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", 256))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 60 * 60))
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "")
+
+# DuckDuckGo result cache, keyed by normalized query + domain set. Results
+# older than SEARCH_CACHE_TTL are still served (up to SEARCH_CACHE_MAX_AGE)
+# while a background refresh runs.
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 2048))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 15 * 60))
+SEARCH_CACHE_MAX_AGE = int(os.getenv("SEARCH_CACHE_MAX_AGE", 2 * 60 * 60))
+
+# Fast mode: skip the Gemini ranking call when the local BM25 pre-ranker
+# already separates the top sources from the rest by FAST_RANKING_MARGIN.
+FAST_RANKING = os.getenv("FAST_RANKING", "").lower() in ("1", "true", "yes")
+FAST_RANKING_MARGIN = float(os.getenv("FAST_RANKING_MARGIN", 1.5))
+
+# HTML parser backend for extraction: "auto" (lxml if installed), "lxml" or "html.parser"
+HTML_PARSER = os.getenv("HTML_PARSER", "auto")
+
+# Per-query latency budget (seconds) for search, page fetches and ranking.
+# When it runs out the pipeline continues with whatever has arrived. 0 disables.
+QUERY_DEADLINE = float(os.getenv("QUERY_DEADLINE", 10))
+
+# The per-domain search wave is skipped when the combined search already found
+# SUFFICIENT_HITS relevant hits (snippets of SUFFICIENT_SNIPPET_CHARS or more)
+# from SUFFICIENT_DOMAINS different sites; otherwise only the missing sites are searched.
+SUFFICIENT_HITS = int(os.getenv("SUFFICIENT_HITS", 8))
+SUFFICIENT_DOMAINS = int(os.getenv("SUFFICIENT_DOMAINS", 3))
+SUFFICIENT_SNIPPET_CHARS = int(os.getenv("SUFFICIENT_SNIPPET_CHARS", 80))
+
+# Pipeline telemetry (services/telemetry.py): TRACE_LOG=1 logs every stage
+# span as a JSON line; METRICS_FILE / METRICS_PORT export Prometheus text.
+TRACE_LOG = os.getenv("TRACE_LOG", "").lower() in ("1", "true", "yes")
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+# Local-only by default; set to 0.0.0.0 to let a Prometheus on another host scrape it
+METRICS_BIND = os.getenv("METRICS_BIND", "127.0.0.1")
+
+# Process-wide capacity (services/workers.py). At most MAX_ACTIVE_QUERIES
+# pipeline runs at once; up to MAX_QUEUED_QUERIES more wait up to
+# ADMISSION_WAIT seconds for a turn, and the rest are told the app is busy.
+# Searches and page fetches from every query share SEARCH_WORKERS / FETCH_WORKERS threads.
+MAX_ACTIVE_QUERIES = int(os.getenv("MAX_ACTIVE_QUERIES", 8))
+MAX_QUEUED_QUERIES = int(os.getenv("MAX_QUEUED_QUERIES", 16))
+ADMISSION_WAIT = float(os.getenv("ADMISSION_WAIT", 5))
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", 32))
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", 32))
+
+# Gemini quota per model: requests and input tokens per minute. The call
+# scheduler (services/gemini_scheduler.py) paces calls to stay inside it;
+# models not listed aren't paced. Defaults are the paid tier 1 limits.
+GEMINI_QUOTAS = {
+    model.strip(): tuple(int(n) for n in limits.split("/"))
+    for model, _, limits in (
+        pair.partition("=") for pair in os.getenv(
+            "GEMINI_QUOTAS",
+            "gemini-2.5-pro=150/2000000,gemini-3.1-pro-preview=150/2000000,gemini-2.5-flash=1000/1000000",
+        ).split(",") if pair.strip()
+    )
+}
+# Retries of a Gemini call after a rate limit (429) or a transient server error
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 3))
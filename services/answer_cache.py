@@ -0,0 +1,80 @@
+"""Answer-level cache for search_and_summarize.
+
+Keys are normalized queries, so "How do volcanoes work?" and "how do
+VOLCANOES work" hit the same entry. Lookups go through an in-process LRU
+first, then the optional SQLite tier (ANSWER_CACHE_PATH).
+"""
+import copy
+import json
+import sqlite3
+import time
+
+from config import ANSWER_CACHE_PATH, ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL
+from services.memory_cache import TTLCache
+from services.sqlite_util import thread_connection
+from services.text_utils import normalize_query
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    stored_at REAL NOT NULL
+);
+"""
+
+_memory = TTLCache(ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL)
+
+
+def get(query: str) -> dict | None:
+    """Return a copy of the cached {summary, sources} result for a query, or None."""
+    key = normalize_query(query)
+    result = _memory.get(key)
+    if result is None:
+        entry = _disk_get(key)
+        if entry is None:
+            return None
+        result, age = entry
+        _memory.set(key, result, age=age)
+    return copy.deepcopy(result)
+
+
+def put(query: str, result: dict):
+    """Cache a finished result under the query's normalized key."""
+    key = normalize_query(query)
+    result = copy.deepcopy(result)
+    _memory.set(key, result)
+    _disk_put(key, result)
+
+
+def _disk_get(key: str) -> tuple[dict, float] | None:
+    if not ANSWER_CACHE_PATH:
+        return None
+    try:
+        row = thread_connection(ANSWER_CACHE_PATH, _SCHEMA).execute(
+            "SELECT result, stored_at FROM answers WHERE key = ?", (key,)
+        ).fetchone()
+    except (sqlite3.Error, OSError):
+        return None
+    if row is None:
+        return None
+    age = time.time() - row["stored_at"]
+    if age >= ANSWER_CACHE_TTL:
+        return None
+    return json.loads(row["result"]), age
+
+
+def _disk_put(key: str, result: dict):
+    if not ANSWER_CACHE_PATH:
+        return
+    try:
+        conn = thread_connection(ANSWER_CACHE_PATH, _SCHEMA)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?)",
+                (key, json.dumps(result), time.time()),
+            )
+            conn.execute(
+                "DELETE FROM answers WHERE stored_at < ?", (time.time() - ANSWER_CACHE_TTL,)
+            )
+    except (sqlite3.Error, OSError):
+        pass
@@ -0,0 +1,148 @@
+"""Persistent cache of extracted pages, stored in SQLite (WAL mode).
+
+Entries are keyed by canonical URL and expire after a TTL that depends on the
+site's whitelist category. Expired entries are kept so the extractor can
+revalidate them with If-None-Match / If-Modified-Since instead of re-parsing.
+"""
+import sqlite3
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config import (
+    ARTICLE_CACHE_DEFAULT_TTL,
+    ARTICLE_CACHE_PATH,
+    ARTICLE_CACHE_TTLS,
+    get_whitelist,
+)
+from services.sqlite_util import thread_connection
+
+_TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref"}
+
+# "articles" was the pre-extract_page table; its rows lack description/canonical_url
+_SCHEMA = """
+DROP TABLE IF EXISTS articles;
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    text TEXT NOT NULL,
+    image_url TEXT NOT NULL,
+    resolved_url TEXT NOT NULL,
+    canonical_url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL so trivially different links share one cache entry."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode([
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    ])
+    return urlunsplit(((parts.scheme or "https").lower(), host, path, query, ""))
+
+
+def _ttl_for(url: str) -> int:
+    site = get_whitelist().site(urlsplit(url).netloc.lower().removeprefix("www."))
+    category = site.get("category", "") if site else ""
+    return ARTICLE_CACHE_TTLS.get(category, ARTICLE_CACHE_DEFAULT_TTL)
+
+
+def _connection() -> sqlite3.Connection | None:
+    """Return this thread's connection to the cache database (None if disabled)."""
+    if not ARTICLE_CACHE_PATH:
+        return None
+    return thread_connection(ARTICLE_CACHE_PATH, _SCHEMA)
+
+
+def lookup(url: str) -> dict | None:
+    """Return the cached entry for a URL, or None.
+
+    The entry has extract_page's fields plus "etag", "last_modified"
+    and "fresh" (False once the category TTL has passed).
+    """
+    key = canonical_url(url)
+    try:
+        conn = _connection()
+        if conn is None:
+            return None
+        row = conn.execute("SELECT * FROM pages WHERE url = ?", (key,)).fetchone()
+    except (sqlite3.Error, OSError):
+        return None
+    if row is None:
+        return None
+
+    entry = dict(row)
+    entry["url"] = url
+    entry["fresh"] = time.time() - entry.pop("fetched_at") < _ttl_for(key)
+    return entry
+
+
+def store(url: str, page: dict, etag: str | None = None, last_modified: str | None = None):
+    """Save an extracted page along with the validators from its response."""
+    try:
+        conn = _connection()
+        if conn is None:
+            return
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    canonical_url(url),
+                    page.get("title", ""),
+                    page.get("description", ""),
+                    page.get("text", ""),
+                    page.get("image_url", ""),
+                    page.get("resolved_url", url),
+                    page.get("canonical_url", ""),
+                    etag,
+                    last_modified,
+                    time.time(),
+                ),
+            )
+    except (sqlite3.Error, OSError):
+        pass
+
+
+def touch(url: str):
+    """Mark a cached entry fresh again after a 304 Not Modified."""
+    try:
+        conn = _connection()
+        if conn is None:
+            return
+        with conn:
+            conn.execute(
+                "UPDATE pages SET fetched_at = ? WHERE url = ?",
+                (time.time(), canonical_url(url)),
+            )
+    except (sqlite3.Error, OSError):
+        pass
+
+
+def revalidation_headers(entry: dict) -> dict:
+    """Conditional request headers for an expired entry."""
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def as_page(entry: dict) -> dict:
+    """Strip cache bookkeeping from an entry, leaving extract_page's result shape."""
+    return {
+        "url": entry["url"],
+        "resolved_url": entry["resolved_url"],
+        "canonical_url": entry["canonical_url"],
+        "title": entry["title"],
+        "description": entry["description"],
+        "image_url": entry["image_url"],
+        "text": entry["text"],
+    }
@@ -1,7 +1,36 @@
-from urllib.parse import urlparse
+import asyncio
+import atexit
+import socket
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import NamedTuple
+from urllib.parse import urljoin, urlparse
 
+import httpcore
 import httpx
-from bs4 import BeautifulSoup
+import soupsieve
+
+from config import Whitelist, get_whitelist
+from services import article_cache
+from services.domain_health import fetch_health
+from services.html_parsers import make_soup
+from services.singleflight import SingleFlight
+from services.telemetry import span
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx when installed)
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+
+try:
+    import brotli  # noqa: F401  (lets httpx decode br responses)
+    _ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    _ACCEPT_ENCODING = "gzip, deflate"
 
 # Realistic browser headers to avoid blocks
 HEADERS = {
@@ -12,135 +41,771 @@ HEADERS = {
     ),
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
     "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": _ACCEPT_ENCODING,
 }
 
+# Streamed page downloads stop early; see _BodyCollector
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+MAX_PAGE_BYTES = 1_000_000
+STOP_AFTER_PARAGRAPHS = 60
+# After stopping early, up to this many more bytes are read and thrown away so
+# the connection is left at a response boundary and can be reused
+DRAIN_MAX_BYTES = 256_000
 
-def extract_metadata(url: str) -> dict:
-    """Fetch a URL and extract og:image, description, and resolved URL."""
-    result = {"image_url": "", "description": "", "resolved_url": url}
+# Shared connection pool: one client for every thread and Streamlit session
+MAX_CONNECTIONS = 64
+MAX_KEEPALIVE_CONNECTIONS = 32
+KEEPALIVE_EXPIRY = 60.0
+DEFAULT_HOST_CONNECTIONS = 4  # per-site override: "max_connections" in whitelist.json
+DNS_CACHE_TTL = 300.0
+FETCH_TIMEOUT = 10.0
+# Responses that mean the site is refusing us rather than missing a page
+BLOCKED_STATUSES = (403, 429)
+
+_host_slots: dict[str, threading.BoundedSemaphore] = {}
+_pages = SingleFlight()  # extract_page calls in flight, by canonical URL
+_http_client = None
+_http_client_lock = threading.Lock()
+_async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_async_host_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+class _DNSCache:
+    """Small TTL cache of resolved addresses, shared by the sync and async backends."""
+
+    def __init__(self):
+        self._entries: dict[tuple[str, int], tuple[float, list[str]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str, port: int) -> list[str] | None:
+        with self._lock:
+            entry = self._entries.get((host, port))
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def put(self, host: str, port: int, infos: list) -> list[str]:
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self._entries[(host, port)] = (time.monotonic() + DNS_CACHE_TTL, addresses)
+        return addresses
+
+    def forget(self, host: str, port: int):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+_dns_cache = _DNSCache()
+
+
+class _CachingDNSBackend(httpcore.SyncBackend):
+    """httpcore network backend that reuses DNS answers for DNS_CACHE_TTL seconds."""
+
+    def _resolve(self, host: str, port: int) -> list[str]:
+        addresses = _dns_cache.get(host, port)
+        if addresses is None:
+            try:
+                infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            except OSError as exc:
+                raise httpcore.ConnectError(str(exc)) from exc
+            addresses = _dns_cache.put(host, port, infos)
+        return addresses
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        # TLS SNI and the Host header still use the original hostname
+        error = httpcore.ConnectError(f"No addresses for {host}")
+        for address in self._resolve(host, port):
+            try:
+                return super().connect_tcp(address, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as exc:
+                error = exc
+        _dns_cache.forget(host, port)
+        raise error
+
+
+class _AsyncCachingDNSBackend(httpcore.AnyIOBackend):
+    """Async counterpart of _CachingDNSBackend."""
+
+    async def _resolve(self, host: str, port: int) -> list[str]:
+        addresses = _dns_cache.get(host, port)
+        if addresses is None:
+            try:
+                infos = await asyncio.get_running_loop().getaddrinfo(
+                    host, port, type=socket.SOCK_STREAM
+                )
+            except OSError as exc:
+                raise httpcore.ConnectError(str(exc)) from exc
+            addresses = _dns_cache.put(host, port, infos)
+        return addresses
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        error = httpcore.ConnectError(f"No addresses for {host}")
+        for address in await self._resolve(host, port):
+            try:
+                return await super().connect_tcp(address, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as exc:
+                error = exc
+        _dns_cache.forget(host, port)
+        raise error
+
+
+# httpcore errors and the httpx errors they surface as, most specific first
+_HTTPCORE_ERRORS = (
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.ProxyError, httpx.ProxyError),
+)
+
+
+@contextmanager
+def _httpx_errors():
+    try:
+        yield
+    except Exception as exc:
+        for core_error, httpx_error in _HTTPCORE_ERRORS:
+            if isinstance(exc, core_error):
+                raise httpx_error(str(exc)) from exc
+        raise
+
+
+def _core_request(request: httpx.Request) -> httpcore.Request:
+    return httpcore.Request(
+        method=request.method,
+        url=httpcore.URL(
+            scheme=request.url.raw_scheme,
+            host=request.url.raw_host,
+            port=request.url.port,
+            target=request.url.raw_path,
+        ),
+        headers=request.headers.raw,
+        content=request.stream,
+        extensions=request.extensions,
+    )
+
+
+class _ResponseStream(httpx.SyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+
+    def __iter__(self):
+        with _httpx_errors():
+            yield from self._stream
+
+    def close(self):
+        self._stream.close()
+
+
+class _AsyncResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def __aiter__(self):
+        with _httpx_errors():
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self):
+        await self._stream.aclose()
+
+
+class _CachingDNSTransport(httpx.BaseTransport):
+    """Transport over an httpcore pool whose connections resolve hosts through the shared DNS cache.
+
+    httpx.HTTPTransport can't be given a network backend, so this owns the
+    pool it builds. It only does what the fetchers need: no proxies, retries
+    or socket options.
+    """
+
+    def __init__(self, limits: httpx.Limits, http2: bool):
+        self._pool = httpcore.ConnectionPool(**_pool_options(limits, http2), network_backend=_CachingDNSBackend())
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with _httpx_errors():
+            resp = self._pool.handle_request(_core_request(request))
+        return httpx.Response(
+            resp.status, headers=resp.headers, stream=_ResponseStream(resp.stream), extensions=resp.extensions
+        )
+
+    def close(self):
+        self._pool.close()
+
+
+class _AsyncCachingDNSTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of _CachingDNSTransport."""
+
+    def __init__(self, limits: httpx.Limits, http2: bool):
+        self._pool = httpcore.AsyncConnectionPool(
+            **_pool_options(limits, http2), network_backend=_AsyncCachingDNSBackend()
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with _httpx_errors():
+            resp = await self._pool.handle_async_request(_core_request(request))
+        return httpx.Response(
+            resp.status, headers=resp.headers, stream=_AsyncResponseStream(resp.stream), extensions=resp.extensions
+        )
+
+    async def aclose(self):
+        await self._pool.aclose()
+
+
+def _pool_options(limits: httpx.Limits, http2: bool) -> dict:
+    """httpcore pool settings for the client's limits (what httpx.HTTPTransport would pass)."""
+    return {
+        "ssl_context": httpx.create_ssl_context(),
+        "max_connections": limits.max_connections,
+        "max_keepalive_connections": limits.max_keepalive_connections,
+        "keepalive_expiry": limits.keepalive_expiry,
+        "http1": True,
+        "http2": http2,
+    }
+
+
+def _client_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def _get_http_client() -> httpx.Client:
+    """Return the process-wide pooled HTTP client, creating it on first use."""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    transport=_CachingDNSTransport(_client_limits(), HTTP2_ENABLED),
+                    headers=HEADERS,
+                    timeout=FETCH_TIMEOUT,
+                    follow_redirects=True,
+                    max_redirects=10,
+                )
+    return _http_client
+
+
+def _get_async_http_client() -> httpx.AsyncClient:
+    """Return the pooled async client for the running event loop.
+
+    Async connections are bound to the loop that opened them, so each loop
+    gets its own client. Nothing closes it automatically: whoever owns the
+    loop should await aclose_http_client() before the loop ends, or its
+    sockets stay open until the client is garbage collected.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_http_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            transport=_AsyncCachingDNSTransport(_client_limits(), HTTP2_ENABLED),
+            headers=HEADERS,
+            timeout=FETCH_TIMEOUT,
+            follow_redirects=True,
+            max_redirects=10,
+        )
+        _async_http_clients[loop] = client
+    return client
+
+
+def close_http_client():
+    """Close the shared HTTP client (called automatically at interpreter exit)."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+
+async def aclose_http_client():
+    """Close the async client bound to the running event loop, if any.
+
+    Await this before closing a loop that ran async fetches (e.g. at the end
+    of the coroutine passed to asyncio.run).
+    """
+    client = _async_http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+atexit.register(close_http_client)
+
+
+def _host_key(url: str) -> str:
+    return urlparse(url).netloc.lower().removeprefix("www.")
+
+
+def _host_limit(host: str) -> int:
+    site = get_whitelist().site(host)
+    return site.get("max_connections", DEFAULT_HOST_CONNECTIONS) if site else DEFAULT_HOST_CONNECTIONS
+
+
+@contextmanager
+def _host_slot(url: str, timeout: float):
+    """Hold one of the per-host connection slots for the duration of a request.
+
+    Raises _HostBusy if no slot frees up within `timeout` seconds.
+    """
+    host = _host_key(url)
+    slot = _host_slots.get(host)
+    if slot is None:
+        with _http_client_lock:
+            slot = _host_slots.setdefault(
+                host, threading.BoundedSemaphore(_host_limit(host))
+            )
+    if not slot.acquire(timeout=max(0.0, timeout)):
+        raise _HostBusy(host)
+    try:
+        yield
+    finally:
+        slot.release()
+
+
+class _NotHTML(Exception):
+    """Raised for responses that aren't HTML pages (PDFs, images, JSON, ...)."""
+
+
+class _CircuitOpen(Exception):
+    """Raised instead of fetching from a site that keeps failing (see domain_health)."""
+
+
+class _HostBusy(Exception):
+    """Raised when the site's connection slots stay taken for the whole fetch budget."""
+
+
+def _record_fetch(host: str, started: float, status: int):
+    """Feed one request's outcome into fetch_health (status 0 for a failed request)."""
+    blocked = status in BLOCKED_STATUSES
+    fetch_health.record(host, time.monotonic() - started, ok=0 < status < 500 and not blocked, blocked=blocked)
+
+
+def _budget(host: str, timeout: float | None) -> tuple[float, bool]:
+    """Timeout for one fetch: the caller's (or FETCH_TIMEOUT), shortened for sites known to be fast.
 
+    Also says whether the caller's deadline cut it below the site's usual
+    timeout, in which case timing out isn't held against the site.
+    """
+    if not fetch_health.allow(host):
+        raise _CircuitOpen(host)
+    full = fetch_health.timeout(host, FETCH_TIMEOUT)
+    budget = fetch_health.timeout(host, FETCH_TIMEOUT if timeout is None else timeout)
+    return budget, budget < full
+
+
+class _BodyCollector:
+    """Accumulates a streamed HTML body and says when to stop reading.
+
+    Collecting stops at MAX_PAGE_BYTES, once STOP_AFTER_PARAGRAPHS closing
+    </p> tags have arrived, or at the first </article> after a few
+    paragraphs; extraction keeps only the first 2000 characters of text
+    anyway. If the rest of the body is small (DRAIN_MAX_BYTES) it is still
+    read and discarded, since closing a half-read response drops the
+    keep-alive connection.
+    """
+
+    def __init__(self, resp: httpx.Response):
+        content_type = resp.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type and content_type not in HTML_CONTENT_TYPES:
+            raise _NotHTML(content_type)
+        self.resp = resp
+        self.encoding = resp.charset_encoding or "utf-8"
+        self.body = bytearray()
+        self.paragraphs = 0
+        # End of the previous chunk, so tags split across chunks are still seen
+        self._tail = b""
+        # Raw bytes downloaded when collecting stopped (None while collecting)
+        self._drain_from: int | None = None
+
+    def feed(self, chunk: bytes) -> bool:
+        """Add a chunk; return True when reading can stop."""
+        if self._drain_from is not None:
+            return self.resp.num_bytes_downloaded - self._drain_from > DRAIN_MAX_BYTES
+        self.body += chunk
+        lowered = self._tail + chunk.lower()
+        # Tags already counted in the tail are subtracted back out
+        self.paragraphs += lowered.count(b"</p>") - self._tail.count(b"</p>")
+        self._tail = lowered[-(len(b"</article>") - 1):]
+        if (
+            len(self.body) >= MAX_PAGE_BYTES
+            or self.paragraphs >= STOP_AFTER_PARAGRAPHS
+            or (self.paragraphs >= 3 and b"</article>" in lowered)
+        ):
+            self._drain_from = self.resp.num_bytes_downloaded
+            length = self.resp.headers.get("content-length", "")
+            return length.isdigit() and int(length) - self._drain_from > DRAIN_MAX_BYTES
+        return False
+
+    def text(self) -> str:
+        return self.body.decode(self.encoding, errors="replace")
+
+
+def _fetch(
+    url: str, headers: dict | None = None, timeout: float | None = None
+) -> tuple[httpx.Response, str]:
+    """GET a URL through the shared client, respecting the per-host connection cap.
+
+    The body is streamed and only read far enough to extract from (see
+    _BodyCollector), and reading stops once `timeout` seconds (default
+    FETCH_TIMEOUT, less for sites that are usually fast) have passed, time
+    spent waiting for one of the host's connection slots included (_HostBusy
+    if none frees up).
+    Non-success responses come back with an empty body. Every request is
+    recorded in fetch_health, except timeouts of a budget the caller's
+    deadline cut short; sites whose circuit is open raise _CircuitOpen.
+    """
+    host = _host_key(url)
+    timeout, cut_short = _budget(host, timeout)
+    give_up_at = time.monotonic() + timeout
+    # Time spent queued behind other fetches to the host comes out of the budget
+    with _host_slot(url, timeout):
+        started = time.monotonic()
+        status = None
+        try:
+            with _get_http_client().stream("GET", url, headers=headers, timeout=give_up_at - started) as resp:
+                status = resp.status_code
+                if not resp.is_success:
+                    return resp, ""
+                collector = _BodyCollector(resp)
+                for chunk in resp.iter_bytes():
+                    if collector.feed(chunk) or time.monotonic() > give_up_at:
+                        break
+                return resp, collector.text()
+        except httpx.TimeoutException:
+            status = None if cut_short else 0
+            raise
+        except httpx.RequestError:
+            status = 0
+            raise
+        finally:
+            if status is not None:
+                _record_fetch(host, started, status)
+
+
+async def _afetch(
+    url: str, headers: dict | None = None, timeout: float | None = None
+) -> tuple[httpx.Response, str]:
+    """Async variant of _fetch using the loop's shared client."""
+    host = _host_key(url)
+    timeout, cut_short = _budget(host, timeout)
+    give_up_at = time.monotonic() + timeout
+    slots = _async_host_slots.setdefault(asyncio.get_running_loop(), {})
+    slot = slots.get(host)
+    if slot is None:
+        slot = slots[host] = asyncio.Semaphore(_host_limit(host))
     try:
-        with httpx.Client(timeout=10.0, follow_redirects=True, max_redirects=10) as client:
-            resp = client.get(url, headers=HEADERS)
-            result["resolved_url"] = str(resp.url)
-            resp.raise_for_status()
+        await asyncio.wait_for(slot.acquire(), timeout)
+    except TimeoutError:
+        raise _HostBusy(host) from None
+    started = time.monotonic()
+    # Stays None if the task is cancelled before a response arrives,
+    # so abandoned fetches don't count against the site
+    status = None
+    try:
+        async with _get_async_http_client().stream("GET", url, headers=headers, timeout=give_up_at - started) as resp:
+            status = resp.status_code
+            if not resp.is_success:
+                return resp, ""
+            collector = _BodyCollector(resp)
+            async for chunk in resp.aiter_bytes():
+                if collector.feed(chunk) or time.monotonic() > give_up_at:
+                    break
+            return resp, collector.text()
+    except httpx.TimeoutException:
+        status = None if cut_short else 0
+        raise
+    except httpx.RequestError:
+        status = 0
+        raise
+    finally:
+        slot.release()
+        if status is not None:
+            _record_fetch(host, started, status)
+
+
+def extract_page(url: str, timeout: float | None = None) -> dict:
+    """Fetch a URL once and extract everything the app uses from it.
+
+    Returns url, resolved_url, canonical_url, title, description, image_url
+    and text, all from a single fetch and a single parse. Results are served
+    from the article cache while fresh; expired entries are revalidated with a
+    conditional GET and reused on 304 Not Modified. timeout caps the whole
+    download (default FETCH_TIMEOUT). Concurrent calls for the same canonical
+    URL share one fetch.
+    """
+    page, shared = _pages.do(article_cache.canonical_url(url), _extract_page, url, timeout)
+    return _own_copy(page, url) if shared else page
+
+
+def _extract_page(url: str, timeout: float | None) -> dict:
+    cached = article_cache.lookup(url)
+    if cached and cached["fresh"]:
+        return article_cache.as_page(cached)
+
+    page = _empty_page(url)
+    try:
+        with span("fetch", domain=_host_key(url), revalidate=bool(cached)) as s:
+            resp, html = _fetch(url, article_cache.revalidation_headers(cached) if cached else None, timeout)
+            _describe_response(s, resp)
+        if cached and resp.status_code == 304:
+            article_cache.touch(url)
+            return article_cache.as_page(cached)
+        page["resolved_url"] = str(resp.url)
+        resp.raise_for_status()
     except Exception:
+        if cached:
+            return article_cache.as_page(cached)
         # Even if fetch fails, set a favicon fallback
-        _set_favicon_fallback(result)
-        return result
-
-    soup = BeautifulSoup(resp.text, "html.parser")
-
-    # --- Extract image ---
-    # Priority: og:image > twitter:image > first content image
-    for selector in [
-        ("meta", {"property": "og:image"}),
-        ("meta", {"attrs": {"name": "twitter:image"}}),
-        ("meta", {"attrs": {"name": "twitter:image:src"}}),
-    ]:
-        tag = soup.find(selector[0], **selector[1])
-        if tag and tag.get("content"):
-            result["image_url"] = tag["content"]
-            break
-
-    # Fallback: first reasonably-sized image in content
-    if not result["image_url"]:
-        for container_tag in ["article", "main", "body"]:
-            container = soup.find(container_tag)
-            if container:
-                for img in container.find_all("img", src=True, limit=5):
-                    src = img.get("src", "")
-                    # Skip tiny icons, tracking pixels, SVGs
-                    if any(skip in src.lower() for skip in [
-                        "icon", "logo", "pixel", "tracker", "badge",
-                        "1x1", "spacer", ".svg", "data:image",
-                    ]):
-                        continue
-                    result["image_url"] = src
-                    break
-                if result["image_url"]:
-                    break
+        _set_favicon_fallback(page)
+        return page
+
+    with span("parse", domain=_host_key(url), html_chars=len(html)) as s:
+        _parse_page(html, page)
+        s["text_chars"] = len(page["text"])
+    _store_page(url, page, resp)
+    return page
+
+
+async def aextract_page(url: str, timeout: float | None = None) -> dict:
+    """Async variant of extract_page (parsing and the article cache run in the default executor).
+
+    Uses the running loop's HTTP client; call aclose_http_client() before the
+    loop ends to close its connections.
+    """
+    page, shared = await _pages.ado(article_cache.canonical_url(url), _aextract_page, url, timeout)
+    return _own_copy(page, url) if shared else page
 
-    # Make relative URLs absolute
-    if result["image_url"] and not result["image_url"].startswith("http"):
-        if result["image_url"].startswith("//"):
-            result["image_url"] = "https:" + result["image_url"]
-        elif result["image_url"].startswith("/"):
-            parsed = urlparse(result["resolved_url"])
-            result["image_url"] = f"{parsed.scheme}://{parsed.netloc}{result['image_url']}"
-
-    # Final fallback: Google favicon
-    if not result["image_url"]:
-        _set_favicon_fallback(result)
-
-    # --- Extract description ---
-    for selector in [
-        ("meta", {"property": "og:description"}),
-        ("meta", {"attrs": {"name": "description"}}),
-        ("meta", {"attrs": {"name": "twitter:description"}}),
-    ]:
-        tag = soup.find(selector[0], **selector[1])
-        if tag and tag.get("content"):
-            result["description"] = tag["content"][:300]
-            break
-
-    return result
-
-
-def extract_article_text(url: str) -> dict:
-    """Fetch a URL and extract article text, title, image, and resolved URL."""
-    result = {"text": "", "title": "", "image_url": "", "url": url, "resolved_url": url}
 
+async def _aextract_page(url: str, timeout: float | None) -> dict:
+    # The article cache is sqlite; keep its blocking calls off the event loop
+    cached = await asyncio.to_thread(article_cache.lookup, url)
+    if cached and cached["fresh"]:
+        return article_cache.as_page(cached)
+
+    page = _empty_page(url)
     try:
-        with httpx.Client(timeout=10.0, follow_redirects=True, max_redirects=10) as client:
-            resp = client.get(url, headers=HEADERS)
-            result["resolved_url"] = str(resp.url)
-            resp.raise_for_status()
+        with span("fetch", domain=_host_key(url), revalidate=bool(cached)) as s:
+            resp, html = await _afetch(
+                url, article_cache.revalidation_headers(cached) if cached else None, timeout
+            )
+            _describe_response(s, resp)
+        if cached and resp.status_code == 304:
+            await asyncio.to_thread(article_cache.touch, url)
+            return article_cache.as_page(cached)
+        page["resolved_url"] = str(resp.url)
+        resp.raise_for_status()
     except Exception:
-        _set_favicon_fallback(result)
-        return result
+        if cached:
+            return article_cache.as_page(cached)
+        _set_favicon_fallback(page)
+        return page
+
+    with span("parse", domain=_host_key(url), html_chars=len(html)) as s:
+        await asyncio.to_thread(_parse_page, html, page)
+        s["text_chars"] = len(page["text"])
+    await asyncio.to_thread(_store_page, url, page, resp)
+    return page
+
+
+def _own_copy(page: dict, url: str) -> dict:
+    """A coalesced caller's copy of a shared page, under the URL it asked for."""
+    return dict(page, url=url)
+
+
+def _describe_response(attrs: dict, resp: httpx.Response):
+    """Add a fetch's status and size to its trace span; HTTP errors count as errors."""
+    attrs["status"] = resp.status_code
+    attrs["bytes"] = resp.num_bytes_downloaded
+    if resp.is_error:
+        attrs["error"] = f"HTTP {resp.status_code}"
+
+
+def extract_metadata(url: str) -> dict:
+    """Fetch a URL and extract og:image, description, and resolved URL."""
+    return _metadata_view(extract_page(url))
+
+
+def extract_article_text(url: str, timeout: float | None = None) -> dict:
+    """Fetch a URL and extract article text, title, image, and resolved URL."""
+    return _article_view(extract_page(url, timeout))
+
 
-    soup = BeautifulSoup(resp.text, "html.parser")
+async def aextract_article_text(url: str, timeout: float | None = None) -> dict:
+    """Async variant of extract_article_text."""
+    return _article_view(await aextract_page(url, timeout))
 
-    # Extract title
-    og_title = soup.find("meta", property="og:title")
-    if og_title and og_title.get("content"):
-        result["title"] = og_title["content"]
+
+def _empty_page(url: str) -> dict:
+    return {
+        "url": url,
+        "resolved_url": url,
+        "canonical_url": "",
+        "title": "",
+        "description": "",
+        "image_url": "",
+        "text": "",
+    }
+
+
+def _metadata_view(page: dict) -> dict:
+    return {
+        "image_url": page["image_url"],
+        "description": page["description"],
+        "resolved_url": page["resolved_url"],
+    }
+
+
+def _article_view(page: dict) -> dict:
+    return {
+        "text": page["text"],
+        "title": page["title"],
+        "image_url": page["image_url"],
+        "url": page["url"],
+        "resolved_url": page["resolved_url"],
+    }
+
+
+def _store_page(url: str, page: dict, resp: httpx.Response):
+    """Cache a successfully parsed page (empty pages are not cached)."""
+    if page["text"] or page["title"]:
+        article_cache.store(
+            url, page, resp.headers.get("etag"), resp.headers.get("last-modified")
+        )
+
+
+# Image URLs containing these are icons, tracking pixels or SVGs, not photos
+_SKIP_IMAGE_HINTS = (
+    "icon", "logo", "pixel", "tracker", "badge",
+    "1x1", "spacer", ".svg", "data:image",
+)
+_NON_CONTENT_TAGS = ["script", "style", "nav", "footer", "header", "aside", "iframe", "noscript"]
+MAX_TEXT_CHARS = 2000
+
+
+class _ExtractionProfile(NamedTuple):
+    """Compiled per-site extraction rules from a whitelist entry's "extraction" key."""
+
+    content: soupsieve.SoupSieve | None
+    strip: soupsieve.SoupSieve
+    image: soupsieve.SoupSieve | None
+    max_chars: int
+
+
+def _compile_profile(site: dict) -> _ExtractionProfile:
+    rules = site.get("extraction") or {}
+    try:
+        return _ExtractionProfile(
+            content=soupsieve.compile(rules["content"]) if rules.get("content") else None,
+            strip=soupsieve.compile(", ".join(_NON_CONTENT_TAGS + rules.get("strip", []))),
+            image=soupsieve.compile(rules["image"]) if rules.get("image") else None,
+            max_chars=rules.get("max_chars", MAX_TEXT_CHARS),
+        )
+    except soupsieve.SelectorSyntaxError as e:
+        raise ValueError(f"Invalid extraction selector for {site.get('name', site['domain'])}: {e}") from e
+
+
+@lru_cache(maxsize=1)
+def _site_profiles(whitelist: Whitelist) -> dict[str, _ExtractionProfile]:
+    """Compiled profiles for one version of the whitelist (recompiled when it reloads)."""
+    return {s["domain"]: _compile_profile(s) for s in whitelist.sites if s.get("extraction")}
+
+
+_DEFAULT_PROFILE = _compile_profile({"domain": ""})
+_site_profiles(get_whitelist())  # fail fast on bad selectors
+
+
+def _profile_for(page: dict) -> _ExtractionProfile:
+    profiles = _site_profiles(get_whitelist())
+    return (
+        profiles.get(_host_key(page["resolved_url"]))
+        or profiles.get(_host_key(page["url"]))
+        or _DEFAULT_PROFILE
+    )
+
+
+def _parse_page(html: str, page: dict, backend: str | None = None):
+    """Fill every extracted field of page from its HTML with one parse.
+
+    Sites with an extraction profile use its selectors directly; the generic
+    article > main > [role=main] > body cascade is only the fallback.
+    """
+    soup = make_soup(html, backend)
+    base_url = page["resolved_url"]
+    profile = _profile_for(page)
+
+    # One pass over <meta> tags; the first non-empty value for each key wins
+    meta = {}
+    for tag in soup.find_all("meta", content=True):
+        key = (tag.get("property") or tag.get("name") or "").lower()
+        if key and key not in meta and tag["content"]:
+            meta[key] = tag["content"]
+
+    # --- Title: og:title > <title> ---
+    if meta.get("og:title"):
+        page["title"] = meta["og:title"]
     elif soup.title and soup.title.string:
-        result["title"] = soup.title.string.strip()
-
-    # Extract image (same logic as extract_metadata)
-    for selector in [
-        ("meta", {"property": "og:image"}),
-        ("meta", {"attrs": {"name": "twitter:image"}}),
-    ]:
-        tag = soup.find(selector[0], **selector[1])
-        if tag and tag.get("content"):
-            result["image_url"] = tag["content"]
-            break
-
-    if not result["image_url"]:
-        _set_favicon_fallback(result)
-
-    # Make relative image URLs absolute
-    if result["image_url"] and not result["image_url"].startswith("http"):
-        if result["image_url"].startswith("//"):
-            result["image_url"] = "https:" + result["image_url"]
-        elif result["image_url"].startswith("/"):
-            parsed = urlparse(result["resolved_url"])
-            result["image_url"] = f"{parsed.scheme}://{parsed.netloc}{result['image_url']}"
-
-    # Remove non-content elements
-    for tag in soup.find_all(["script", "style", "nav", "footer", "header", "aside", "iframe", "noscript"]):
+        page["title"] = soup.title.string.strip()
+
+    # --- Description ---
+    description = meta.get("og:description") or meta.get("description") or meta.get("twitter:description")
+    page["description"] = (description or "")[:300]
+
+    # --- Canonical link ---
+    canonical = soup.find("link", rel="canonical", href=True)
+    if canonical:
+        page["canonical_url"] = urljoin(base_url, canonical["href"])
+
+    # --- Image: site rule > og:image > twitter:image > first content image ---
+    image = ""
+    if profile.image:
+        tag = profile.image.select_one(soup)
+        if tag:
+            image = tag.get("src") or tag.get("content") or ""
+    image = (
+        image or meta.get("og:image") or meta.get("twitter:image")
+        or meta.get("twitter:image:src") or _first_content_image(soup)
+    )
+    if image:
+        page["image_url"] = image if image.startswith("http") else urljoin(base_url, image)
+    else:
+        _set_favicon_fallback(page)
+
+    # --- Article text ---
+    for tag in profile.strip.select(soup):
         tag.decompose()
 
-    # Extract article text from best container
+    article_text = ""
+    if profile.content:
+        container = profile.content.select_one(soup)
+        if container:
+            article_text = _paragraph_text(container) or container.get_text("\n", strip=True)
+    if not article_text:
+        article_text = _generic_article_text(soup)
+
+    # Truncate to keep Gemini context manageable
+    page["text"] = article_text[:profile.max_chars]
+
+
+def _generic_article_text(soup) -> str:
+    """Paragraph text from the best generic container, falling back to the whole body."""
     article_text = ""
     for container_tag in ["article", "main", "[role='main']"]:
         container = soup.select_one(container_tag) if "[" in container_tag else soup.find(container_tag)
         if container:
-            paragraphs = container.find_all("p")
-            article_text = "\n".join(p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True))
+            article_text = _paragraph_text(container)
             if len(article_text) > 100:
                 break
 
@@ -148,12 +813,25 @@ def extract_article_text(url: str) -> dict:
     if len(article_text) < 100:
         body = soup.find("body")
         if body:
-            paragraphs = body.find_all("p")
-            article_text = "\n".join(p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True))
+            article_text = _paragraph_text(body)
+    return article_text
 
-    # Truncate to keep Gemini context manageable
-    result["text"] = article_text[:2000]
-    return result
+
+def _first_content_image(soup) -> str:
+    """First reasonably-sized image in the main content, or ""."""
+    for container_tag in ["article", "main", "body"]:
+        container = soup.find(container_tag)
+        if container:
+            for img in container.find_all("img", src=True, limit=5):
+                src = img["src"]
+                if not any(skip in src.lower() for skip in _SKIP_IMAGE_HINTS):
+                    return src
+    return ""
+
+
+def _paragraph_text(container) -> str:
+    texts = (p.get_text(strip=True) for p in container.find_all("p"))
+    return "\n".join(t for t in texts if t)
 
 
 def _set_favicon_fallback(result: dict):
@@ -0,0 +1,27 @@
+import math
+import time
+
+
+class Deadline:
+    """Wall-clock budget for one query, shared by the search, fetch and ranking stages."""
+
+    def __init__(self, seconds: float | None):
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self, reserve: float = 0.0, cap: float | None = None) -> float | None:
+        """Seconds left after keeping `reserve` for later stages, clamped to [0, cap].
+
+        Returns cap (possibly None, meaning no limit) when there is no deadline.
+        """
+        if self.expires_at is None:
+            return cap
+        left = max(0.0, self.expires_at - reserve - time.monotonic())
+        return left if cap is None else min(left, cap)
+
+    def expired(self, reserve: float = 0.0) -> bool:
+        return self.remaining(reserve) == 0.0
+
+    def whole_seconds(self, reserve: float = 0.0, cap: float | None = None) -> int | None:
+        """remaining() rounded up to whole seconds (at least 1), for APIs that take ints."""
+        left = self.remaining(reserve, cap)
+        return None if left is None else max(1, math.ceil(left))
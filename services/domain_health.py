@@ -0,0 +1,117 @@
+"""Per-process health of each whitelisted site, for adaptive timeouts and circuit breaking.
+
+Every fetch (and DuckDuckGo search) records its latency and outcome. From the
+last WINDOW outcomes a DomainHealth derives:
+
+- an adaptive timeout: TIMEOUT_MULTIPLIER x the p95 of successful latencies,
+  never below MIN_TIMEOUT or above the caller's default;
+- a circuit breaker: after OPEN_AFTER_FAILURES failures in a row the site is
+  skipped for COOL_DOWN seconds, then a single probe request is let through.
+  A successful probe closes the circuit; a failed one restarts the cool-down.
+"""
+import threading
+import time
+from collections import deque
+
+WINDOW = 50
+MIN_SAMPLES = 5
+TIMEOUT_MULTIPLIER = 4.0
+MIN_TIMEOUT = 2.0
+OPEN_AFTER_FAILURES = 3
+COOL_DOWN = 60.0
+
+
+class _SiteStats:
+    def __init__(self):
+        self.outcomes: deque = deque(maxlen=WINDOW)  # (latency, ok, blocked)
+        self.failures_in_a_row = 0
+        self.opened_at: float | None = None
+
+
+class DomainHealth:
+    """Thread-safe rolling health stats keyed by site (bare domain)."""
+
+    def __init__(self):
+        self._sites: dict[str, _SiteStats] = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, site: str) -> _SiteStats:
+        stats = self._sites.get(site)
+        if stats is None:
+            stats = self._sites[site] = _SiteStats()
+        return stats
+
+    def record(self, site: str, latency: float, ok: bool, blocked: bool = False):
+        """Record one request. blocked marks refusals (403/429, rate limits); they count as failures."""
+        with self._lock:
+            stats = self._stats(site)
+            stats.outcomes.append((latency, ok, blocked))
+            if ok:
+                stats.failures_in_a_row = 0
+                stats.opened_at = None
+            else:
+                stats.failures_in_a_row += 1
+                if stats.opened_at is not None or stats.failures_in_a_row >= OPEN_AFTER_FAILURES:
+                    stats.opened_at = time.monotonic()
+
+    def allow(self, site: str) -> bool:
+        """Whether a request to site may go ahead. Grants one probe per cool-down while open."""
+        with self._lock:
+            stats = self._sites.get(site)
+            if stats is None or stats.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - stats.opened_at < COOL_DOWN:
+                return False
+            # Restarting the cool-down means only this caller probes, and a
+            # probe that never reports back doesn't leave the site stuck
+            stats.opened_at = now
+            return True
+
+    def is_open(self, site: str) -> bool:
+        """Like `not allow(site)`, but never uses up the probe."""
+        with self._lock:
+            stats = self._sites.get(site)
+            return (
+                stats is not None and stats.opened_at is not None
+                and time.monotonic() - stats.opened_at < COOL_DOWN
+            )
+
+    def timeout(self, site: str, default: float) -> float:
+        """Adaptive timeout for site, capped at default (used as is until MIN_SAMPLES successes)."""
+        with self._lock:
+            stats = self._sites.get(site)
+            latencies = [lat for lat, ok, _ in stats.outcomes if ok] if stats else []
+        if len(latencies) < MIN_SAMPLES:
+            return default
+        return min(default, max(MIN_TIMEOUT, _percentile(latencies, 0.95) * TIMEOUT_MULTIPLIER))
+
+    def snapshot(self) -> dict[str, dict]:
+        """Per-site p50/p95 latency, error and block rates, and circuit state."""
+        with self._lock:
+            sites = {site: (list(s.outcomes), s.opened_at) for site, s in self._sites.items()}
+        report = {}
+        for site, (outcomes, opened_at) in sites.items():
+            latencies = [lat for lat, ok, _ in outcomes if ok]
+            report[site] = {
+                "requests": len(outcomes),
+                "p50": _percentile(latencies, 0.5),
+                "p95": _percentile(latencies, 0.95),
+                "error_rate": sum(not ok for _, ok, _ in outcomes) / len(outcomes) if outcomes else 0.0,
+                "block_rate": sum(blocked for _, _, blocked in outcomes) / len(outcomes) if outcomes else 0.0,
+                "open": opened_at is not None,
+            }
+        return report
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# Page downloads and DuckDuckGo searches fail for different reasons, so they
+# are tracked separately
+fetch_health = DomainHealth()
+search_health = DomainHealth()
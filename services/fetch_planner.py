@@ -0,0 +1,110 @@
+"""Decides which search hits are worth downloading, before any page is fetched.
+
+Only a handful of sources are ever used, so instead of fetching every hit the
+pipeline asks a FetchPlanner what to fetch:
+
+1. While searches are still streaming in, hits whose title + snippet cover
+   enough of the query are fetched right away (up to EAGER_FETCHES).
+   After the combined search, phase2_domains() says which sites still need a
+   per-domain search (none when the combined hits are already sufficient).
+2. Once every search has returned, the remaining hits are ranked by BM25 over
+   title + snippet and the best are fetched up to FETCH_BUDGET in total.
+3. If too few pages survive extraction, more are fetched in small batches.
+
+The planner does no I/O, so the thread and asyncio pipelines share it.
+"""
+from urllib.parse import urlparse
+
+from config import SUFFICIENT_DOMAINS, SUFFICIENT_HITS, SUFFICIENT_SNIPPET_CHARS
+from services.lexical_ranker import bm25_scores, query_terms, term_coverage
+from services.text_utils import QUESTION_WORDS
+
+FETCH_BUDGET = 15
+EAGER_FETCHES = 10
+EAGER_MIN_COVERAGE = 0.5
+MIN_CANDIDATES = 8
+TOP_UP_BATCH = 5
+
+
+class FetchPlanner:
+    def __init__(self, query: str):
+        self.query = query
+        self.topic_terms = [t for t in query_terms(query) if t not in QUESTION_WORDS]
+        self.seen_urls: set = set()
+        self.pending: list[tuple[tuple[int, int], dict]] = []
+        self.offered: list[dict] = []
+        self.started = 0
+        self._ranked = False
+
+    def offer(self, phase: int, results: list[dict]) -> list[tuple[tuple[int, int], dict]]:
+        """Register one search's hits; return the ones to fetch immediately.
+
+        Each returned item is ((phase, position), result); the order key keeps
+        candidates in search order regardless of fetch completion.
+        """
+        now = []
+        for pos, result in enumerate(results):
+            if result["url"] in self.seen_urls:
+                continue
+            self.seen_urls.add(result["url"])
+            self.offered.append(result)
+            item = ((phase, pos), result)
+            if self.started < EAGER_FETCHES and self._looks_relevant(result):
+                self.started += 1
+                now.append(item)
+            else:
+                self.pending.append(item)
+        return now
+
+    def phase2_domains(self, domains: list[str]) -> list[str]:
+        """Domains still worth a per-domain search, given the hits offered so far.
+
+        Hits count as usable when they look relevant and have a snippet of at
+        least SUFFICIENT_SNIPPET_CHARS. With SUFFICIENT_HITS usable hits from
+        SUFFICIENT_DOMAINS different sites nothing more is searched; otherwise
+        only the sites without a usable hit are.
+        """
+        usable = [
+            r for r in self.offered
+            if len(r.get("snippet", "")) >= SUFFICIENT_SNIPPET_CHARS and self._looks_relevant(r)
+        ]
+        covered = {_site_of(r["url"]) for r in usable}
+        if len(usable) >= SUFFICIENT_HITS and len(covered) >= SUFFICIENT_DOMAINS:
+            return []
+        return [d for d in domains if d not in covered]
+
+    def after_searches(self) -> list[tuple[tuple[int, int], dict]]:
+        """Rank the hits not fetched yet and return the best, up to FETCH_BUDGET overall."""
+        self._rank_pending()
+        return self._take(FETCH_BUDGET - self.started)
+
+    def top_up(self, usable: int) -> list[tuple[tuple[int, int], dict]]:
+        """Return another batch to fetch if fewer than MIN_CANDIDATES pages were usable."""
+        if usable >= MIN_CANDIDATES:
+            return []
+        self._rank_pending()
+        return self._take(TOP_UP_BATCH)
+
+    def _looks_relevant(self, result: dict) -> bool:
+        if not self.topic_terms:
+            return True
+        text = f"{result.get('title', '')} {result.get('snippet', '')}"
+        return term_coverage(self.topic_terms, text) >= EAGER_MIN_COVERAGE
+
+    def _rank_pending(self):
+        if self._ranked:
+            return
+        docs = [f"{r.get('title', '')} {r.get('snippet', '')}" for _, r in self.pending]
+        scores = bm25_scores(self.query, docs)
+        order = sorted(range(len(self.pending)), key=lambda i: -scores[i])
+        self.pending = [self.pending[i] for i in order]
+        self._ranked = True
+
+    def _take(self, count: int) -> list[tuple[tuple[int, int], dict]]:
+        batch, self.pending = self.pending[:max(count, 0)], self.pending[max(count, 0):]
+        self.started += len(batch)
+        return batch
+
+
+def _site_of(url: str) -> str:
+    return urlparse(url).netloc.lower().removeprefix("www.")
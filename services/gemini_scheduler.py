@@ -0,0 +1,329 @@
+"""Paces, prioritizes and retries Gemini calls, and counts the tokens they use.
+
+    resp = scheduler.generate(client, MODEL_NAME, prompt, config, ANSWER, timeout=60)
+
+Every model in GEMINI_QUOTAS has two token buckets, for requests and for
+input tokens per minute. A call waits until both have room. Priorities
+(ANSWER, then RANKING, then SOURCE_SUMMARIES) apply across models: while a
+call of a higher priority is waiting for any model, lower-priority calls
+wait too, so the answer is never held up by background work. Calls of the
+same priority for one model are served in arrival order. A call's token
+cost is estimated from its prompt up front and corrected from the
+response's usage metadata.
+
+Rate limits (429) and transient server errors (500, 503, 504) are retried
+with full-jitter exponential backoff. A 429 also pauses the model's bucket
+for the delay the API asked for, so other calls back off too. Waiting and
+retrying all fit inside the call's timeout. If quota (ours, or the API's
+after a 429) doesn't free up in time, BusyError is raised; other failures
+raise the last API error.
+
+track_usage() adds up the calls and tokens of everything run inside it,
+including pool threads and tasks started from there.
+"""
+import asyncio
+import collections
+import contextvars
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from google import genai
+from google.genai import errors
+
+from config import GEMINI_MAX_RETRIES, GEMINI_QUOTAS
+from services.telemetry import span
+from services.workers import BusyError
+
+# Call priorities; lower goes first
+ANSWER = 0
+RANKING = 1
+SOURCE_SUMMARIES = 2
+
+RETRY_STATUSES = (429, 500, 503, 504)
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 8.0
+# Rough prompt size in tokens, for reserving quota before the call
+CHARS_PER_TOKEN = 4
+
+_usage: contextvars.ContextVar[dict | None] = contextvars.ContextVar("gemini_usage", default=None)
+
+
+class _Bucket:
+    """Token bucket holding at most a minute's worth, refilled at per_minute a minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (a cost above capacity only needs a full bucket)."""
+        self._refill(now)
+        paused = max(0.0, self.updated - now)
+        return paused + max(0.0, min(amount, self.capacity) - self.level) / self.rate
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+
+    def pause(self, seconds: float, now: float):
+        """Hold the bucket empty for `seconds`."""
+        self._refill(now)
+        self.level = min(self.level, 0.0)
+        self.updated = max(self.updated, now + seconds)
+
+
+class GeminiScheduler:
+    def __init__(self, quotas: dict[str, tuple[int, int]], max_retries: int):
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        self._buckets = {model: (_Bucket(rpm), _Bucket(tpm)) for model, (rpm, tpm) in quotas.items()}
+        self._queues: dict[str, list] = {model: [] for model in quotas}
+        self._waiting: collections.Counter[int] = collections.Counter()  # waiting calls by priority
+        self._async_waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._order = itertools.count()
+
+    def generate(self, client, model: str, contents: str, config, priority: int, timeout: float):
+        """client.models.generate_content, paced and retried within `timeout` seconds."""
+        give_up_at = time.monotonic() + timeout
+        cost = _estimate_tokens(contents, config)
+        with span("gemini", model=model, priority=priority) as s:
+            for attempt in itertools.count():
+                self._acquire(model, cost, priority, give_up_at, s)
+                try:
+                    resp = client.models.generate_content(
+                        model=model, contents=contents, config=_with_timeout(config, give_up_at - time.monotonic()),
+                    )
+                except Exception as exc:
+                    delay = self._retry_delay(model, exc, attempt, give_up_at)
+                    if delay is None:
+                        raise
+                    s["retries"] = attempt + 1
+                    time.sleep(delay)
+                    continue
+                self._account(model, cost, resp.usage_metadata, s)
+                return resp
+
+    async def agenerate(self, client, model: str, contents: str, config, priority: int, timeout: float):
+        """Async variant of generate() (client.aio.models.generate_content)."""
+        give_up_at = time.monotonic() + timeout
+        cost = _estimate_tokens(contents, config)
+        with span("gemini", model=model, priority=priority) as s:
+            for attempt in itertools.count():
+                await self._aacquire(model, cost, priority, give_up_at, s)
+                try:
+                    resp = await client.aio.models.generate_content(
+                        model=model, contents=contents, config=_with_timeout(config, give_up_at - time.monotonic()),
+                    )
+                except Exception as exc:
+                    delay = self._retry_delay(model, exc, attempt, give_up_at)
+                    if delay is None:
+                        raise
+                    s["retries"] = attempt + 1
+                    await asyncio.sleep(delay)
+                    continue
+                self._account(model, cost, resp.usage_metadata, s)
+                return resp
+
+    def generate_stream(self, client, model: str, contents: str, config, priority: int, timeout: float):
+        """Like generate() for generate_content_stream; yields the chunks.
+
+        A failed call is only retried if it failed before its first chunk.
+        """
+        give_up_at = time.monotonic() + timeout
+        cost = _estimate_tokens(contents, config)
+        with span("gemini", model=model, priority=priority, stream=True) as s:
+            for attempt in itertools.count():
+                self._acquire(model, cost, priority, give_up_at, s)
+                usage = None
+                started = False
+                try:
+                    for chunk in client.models.generate_content_stream(
+                        model=model, contents=contents, config=_with_timeout(config, give_up_at - time.monotonic()),
+                    ):
+                        started = True
+                        usage = chunk.usage_metadata or usage
+                        yield chunk
+                except Exception as exc:
+                    delay = None if started else self._retry_delay(model, exc, attempt, give_up_at)
+                    if delay is None:
+                        raise
+                    s["retries"] = attempt + 1
+                    time.sleep(delay)
+                    continue
+                self._account(model, cost, usage, s)
+                return
+
+    def _acquire(self, model: str, cost: int, priority: int, give_up_at: float, attrs: dict):
+        """Wait for the call's turn and room in the model's buckets; BusyError if that can't happen by give_up_at.
+
+        It's the call's turn when it heads its model's queue and no
+        higher-priority call is waiting for any model.
+        """
+        if model not in self._buckets:
+            return
+        entry = (priority, next(self._order))
+        started = time.monotonic()
+        with self._cond:
+            self._enqueue(model, entry)
+            try:
+                while wait := self._poll(model, entry, cost, give_up_at):
+                    self._cond.wait(wait)
+            finally:
+                self._withdraw(model, entry)
+        attrs["queued_ms"] = attrs.get("queued_ms", 0) + round((time.monotonic() - started) * 1000, 1)
+
+    async def _aacquire(self, model: str, cost: int, priority: int, give_up_at: float, attrs: dict):
+        """Async variant of _acquire() that waits on the event loop; a cancelled call leaves the queue."""
+        if model not in self._buckets:
+            return
+        entry = (priority, next(self._order))
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        started = time.monotonic()
+        with self._cond:
+            self._enqueue(model, entry)
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                with self._cond:
+                    waiter[1].clear()
+                    wait = self._poll(model, entry, cost, give_up_at)
+                if not wait:
+                    break
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), wait)
+                except TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+                self._withdraw(model, entry)
+        attrs["queued_ms"] = attrs.get("queued_ms", 0) + round((time.monotonic() - started) * 1000, 1)
+
+    # The helpers below are called with self._cond held
+
+    def _enqueue(self, model: str, entry: tuple[int, int]):
+        heapq.heappush(self._queues[model], entry)
+        self._waiting[entry[0]] += 1
+
+    def _withdraw(self, model: str, entry: tuple[int, int]):
+        queue = self._queues[model]
+        queue.remove(entry)
+        heapq.heapify(queue)
+        self._waiting[entry[0]] -= 1
+        self._notify()
+
+    def _poll(self, model: str, entry: tuple[int, int], cost: int, give_up_at: float) -> float:
+        """Take the call's capacity and return 0 if it's its turn and there's room, else seconds to wait."""
+        requests, tokens = self._buckets[model]
+        now = time.monotonic()
+        wait = None
+        if self._queues[model][0] == entry and not self._outranked(entry[0]):
+            wait = max(requests.wait_time(1, now), tokens.wait_time(cost, now))
+            if wait == 0:
+                requests.take(1, now)
+                tokens.take(cost, now)
+                return 0.0
+        left = give_up_at - now
+        if left <= 0 or (wait is not None and wait > left):
+            raise BusyError(f"{model} quota exhausted")
+        return left if wait is None else wait
+
+    def _notify(self):
+        """Wake every waiting call, sync or async, to re-check its turn."""
+        self._cond.notify_all()
+        for loop, event in self._async_waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _outranked(self, priority: int) -> bool:
+        return any(count for waiting, count in self._waiting.items() if waiting < priority)
+
+    def _retry_delay(self, model: str, exc: Exception, attempt: int, give_up_at: float) -> float | None:
+        """Seconds to wait before retrying after exc, or None if it shouldn't be retried.
+
+        A rate limit that can't be waited out becomes BusyError.
+        """
+        if not isinstance(exc, errors.APIError) or exc.code not in RETRY_STATUSES:
+            return None
+        delay = self._backoff(model, exc, attempt)
+        if attempt >= self.max_retries or time.monotonic() + delay >= give_up_at:
+            if exc.code == 429:
+                raise BusyError(f"{model} is rate limited") from exc
+            return None
+        # After a 429 the paused bucket makes _acquire() do the waiting
+        return 0.0 if exc.code == 429 and model in self._buckets else delay
+
+    def _backoff(self, model: str, exc: errors.APIError, attempt: int) -> float:
+        delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+        if exc.code == 429:
+            delay = max(delay, _retry_after(exc))
+            if model in self._buckets:
+                with self._cond:
+                    for bucket in self._buckets[model]:
+                        bucket.pause(delay, time.monotonic())
+                    self._notify()
+        return delay
+
+    def _account(self, model: str, cost: int, usage_metadata, attrs: dict):
+        """Correct the model's token bucket with the real prompt size and record the usage."""
+        prompt = getattr(usage_metadata, "prompt_token_count", None)
+        response = (getattr(usage_metadata, "candidates_token_count", None) or 0) + (
+            getattr(usage_metadata, "thoughts_token_count", None) or 0
+        )
+        if prompt is not None and model in self._buckets:
+            with self._cond:
+                self._buckets[model][1].take(prompt - cost, time.monotonic())
+        attrs["prompt_tokens"] = prompt or 0
+        attrs["response_tokens"] = response
+        usage = _usage.get()
+        if usage is not None:
+            with self._cond:
+                usage["gemini_calls"] += 1
+                usage["prompt_tokens"] += prompt or 0
+                usage["response_tokens"] += response
+
+
+@contextmanager
+def track_usage():
+    """Yield a dict totalling gemini_calls, prompt_tokens and response_tokens (incl. thinking) made inside the block."""
+    usage = {"gemini_calls": 0, "prompt_tokens": 0, "response_tokens": 0}
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def _estimate_tokens(contents: str, config) -> int:
+    system = getattr(config, "system_instruction", None) or ""
+    return (len(contents) + len(str(system))) // CHARS_PER_TOKEN + 1
+
+
+def _with_timeout(config: genai.types.GenerateContentConfig, seconds: float):
+    """Copy of a generation config whose HTTP request gives up after `seconds`."""
+    http_options = genai.types.HttpOptions(timeout=max(1, int(seconds * 1000)))
+    return config.model_copy(update={"http_options": http_options})
+
+
+def _retry_after(exc: errors.APIError) -> float:
+    """The retry delay a 429 response asked for (google.rpc.RetryInfo), or 0."""
+    details = exc.details.get("error", exc.details) if isinstance(exc.details, dict) else {}
+    for detail in details.get("details", []) if isinstance(details, dict) else []:
+        match = re.fullmatch(r"([\d.]+)s", str(detail.get("retryDelay", "")))
+        if match:
+            return float(match.group(1))
+    return 0.0
+
+
+scheduler = GeminiScheduler(GEMINI_QUOTAS, GEMINI_MAX_RETRIES)
@@ -1,13 +1,31 @@
+import asyncio
+import copy
 import re
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from contextlib import ExitStack
 
 from google import genai
 
-from config import GEMINI_API_KEY, load_whitelist
-from services.content_extractor import extract_article_text
-from services.web_searcher import search_per_domain, search_whitelisted
+from config import FAST_RANKING, FAST_RANKING_MARGIN, GEMINI_API_KEY, QUERY_DEADLINE, get_whitelist
+from services import answer_cache
+from services.content_extractor import FETCH_TIMEOUT, aextract_article_text, extract_article_text
+from services.deadline import Deadline
+from services.fetch_planner import FetchPlanner
+from services.gemini_scheduler import ANSWER, RANKING, SOURCE_SUMMARIES, scheduler, track_usage
+from services.lexical_ranker import has_clear_margin, prerank
+from services.singleflight import SingleFlight
+from services.telemetry import describe, span, submit
+from services.text_utils import normalize_query
+from services.workers import admission, answer_pool, fetch_pool, search_pool
+from services.web_searcher import (
+    asearch_domain,
+    asearch_whitelisted,
+    search_domain,
+    search_whitelisted,
+)
 
 _client = None
+_queries = SingleFlight()  # pipeline runs in flight, by normalized query
 
 
 def _get_client():
@@ -17,9 +35,38 @@ def _get_client():
     return _client
 
 MODEL_NAME = "gemini-2.5-pro"
-
-WHITELISTED_SITES = load_whitelist()
-WHITELISTED_DOMAINS = [site["domain"] for site in WHITELISTED_SITES]
+RANKING_MODEL = "gemini-3.1-pro-preview"
+SOURCE_SUMMARY_MODEL = "gemini-2.5-flash"
+
+# Ask for the per-source summaries in the answer call itself (after a marker
+# line) instead of a separate flash call; the separate call is only a fallback.
+SINGLE_CALL_SOURCE_SUMMARIES = True
+SOURCE_SUMMARY_MARKER = "===SOURCE SUMMARIES==="
+
+# Candidates kept by the local BM25 pre-ranker for the Gemini ranking prompt
+PRERANK_SIZE = 12
+
+# Max article fetches in flight per query in the async pipeline. The thread
+# pipeline needs no cap of its own: the FetchPlanner's budget bounds how many
+# it submits, and the shared fetch_pool bounds how many run at once.
+FETCH_CONCURRENCY = 10
+
+# Seconds of the query deadline kept back from searching/fetching for the
+# ranking call. Ranking itself gets whatever is left, up to RANKING_TIMEOUT.
+RANKING_RESERVE = 2.0
+RANKING_TIMEOUT = 10.0
+# The answer and source summaries run after the deadline, with fixed timeouts
+ANSWER_TIMEOUT = 60.0
+SOURCE_SUMMARY_TIMEOUT = 20.0
+
+NO_RESULTS_MESSAGE = (
+    "I couldn't find any information about that on our safe websites. "
+    "Try asking your question in a different way!"
+)
+UNREADABLE_MESSAGE = (
+    "I found some pages but couldn't read them properly. "
+    "Try asking your question in a different way!"
+)
 
 SYSTEM_PROMPT = """\
 You are a friendly teacher who explains things to kids.
@@ -39,52 +86,233 @@ Rules:
 """
 
 
-def _fetch_candidates(search_results: list[dict], seen_urls: set) -> list[dict]:
-    """Fetch article content and return candidates (skipping duplicates)."""
-    new_results = [r for r in search_results if r["url"] not in seen_urls]
-    if not new_results:
+RANKING_CONFIG = genai.types.GenerateContentConfig(
+    temperature=0.0,
+    max_output_tokens=256,
+)
+ANSWER_CONFIG = genai.types.GenerateContentConfig(
+    system_instruction=SYSTEM_PROMPT,
+    temperature=0.3,
+    max_output_tokens=16384,
+)
+SOURCE_SUMMARY_CONFIG = genai.types.GenerateContentConfig(
+    temperature=0.3,
+    max_output_tokens=8192,
+)
+
+
+def _to_candidate(result: dict, article: dict) -> dict | None:
+    """Combine a search result with its fetched article (None if unreadable)."""
+    title = article.get("title") or result["title"]
+    url = article.get("resolved_url") or result["url"]
+    text = article.get("text", "")
+    snippet = result.get("snippet", "")
+
+    content = text if len(text) > 50 else snippet
+    if not content:
+        return None
+
+    return {
+        "title": title,
+        "url": result["url"],
+        "resolved_url": url,
+        "image_url": article.get("image_url", ""),
+        "description": "",
+        "content": content,
+    }
+
+
+def _fetch_candidate(result: dict, deadline: Deadline) -> dict | None:
+    """Fetch one search result and turn it into a candidate (None once the deadline has passed)."""
+    timeout = deadline.remaining(RANKING_RESERVE, cap=FETCH_TIMEOUT)
+    if not timeout:
+        return None
+    return _to_candidate(result, extract_article_text(result["url"], timeout))
+
+
+def _search_in_time(search, deadline: Deadline, *args, **kwargs) -> list[dict]:
+    """Run a search from the shared pool with the time its query has left when it starts."""
+    if deadline.expired(RANKING_RESERVE):
         return []
+    return search(*args, timeout=deadline.whole_seconds(RANKING_RESERVE), **kwargs)
 
-    with ThreadPoolExecutor(max_workers=10) as pool:
-        articles = list(pool.map(
-            lambda r: extract_article_text(r["url"]), new_results
-        ))
-
-    candidates = []
-    for result, article in zip(new_results, articles):
-        seen_urls.add(result["url"])
-        title = article.get("title") or result["title"]
-        url = article.get("resolved_url") or result["url"]
-        text = article.get("text", "")
-        snippet = result.get("snippet", "")
-
-        content = text if len(text) > 50 else snippet
-        if not content:
-            continue
 
-        candidates.append({
-            "title": title,
-            "url": result["url"],
-            "resolved_url": url,
-            "image_url": article.get("image_url", ""),
-            "description": "",
-            "content": content,
-        })
-    return candidates
+def _gather_candidates(query: str, deadline: Deadline) -> list[dict]:
+    """Search (combined first, per-domain only where needed) and fetch the promising hits as they arrive.
 
+    A FetchPlanner decides which hits are worth downloading and which sites
+    the combined search left underrepresented. Candidates come back in
+    search order (combined hits first, then per-domain hits in whitelist
+    order), whichever fetch finished first. Once the deadline (less
+    RANKING_RESERVE) passes, searches and fetches still running are
+    abandoned and the candidates found so far are returned. Searches and
+    fetches run on the process-wide pools.
+    """
+    domains = list(get_whitelist().domains)
+    planner = FetchPlanner(query)
+    ordered = []
+    submitted = []
 
-def _rank_by_relevance(query: str, candidates: list[dict], top_n: int = 5) -> list[dict]:
-    """Use Gemini to pick the most relevant articles for the query."""
-    if len(candidates) <= top_n:
-        return candidates
+    def _submit(pool, fn, *args, **kwargs):
+        future = submit(pool, fn, *args, **kwargs)
+        submitted.append(future)
+        return future
+
+    def _start(batch) -> dict:
+        return {_submit(fetch_pool, _fetch_candidate, result, deadline): order for order, result in batch}
 
+    try:
+        # Phase 1: one combined search; its eager fetches start right away
+        combined = _submit(search_pool, _search_in_time, search_whitelisted, deadline, query, domains, max_results=20)
+        try:
+            fetches = _start(planner.offer(0, combined.result(timeout=deadline.remaining(RANKING_RESERVE))))
+        except TimeoutError:
+            fetches = {}
+
+        # Phase 2: per-domain searches, only for sites phase 1 didn't cover
+        searches = {}
+        if not deadline.expired(RANKING_RESERVE):
+            wanted = set(planner.phase2_domains(domains))
+            for i, domain in enumerate(domains, 1):
+                if domain in wanted:
+                    searches[_submit(
+                        search_pool, _search_in_time, search_domain, deadline, query, domain, max_results=3
+                    )] = i
+
+        try:
+            for future in as_completed(searches, timeout=deadline.remaining(RANKING_RESERVE)):
+                fetches.update(_start(planner.offer(searches[future], future.result())))
+        except TimeoutError:
+            pass
+        if not deadline.expired(RANKING_RESERVE):
+            fetches.update(_start(planner.after_searches()))
+
+        while fetches:
+            try:
+                for future in as_completed(fetches, timeout=deadline.remaining(RANKING_RESERVE)):
+                    candidate = future.result()
+                    if candidate:
+                        ordered.append((fetches[future], candidate))
+            except TimeoutError:
+                break
+            fetches = _start(planner.top_up(len(ordered)))
+    finally:
+        # Drop work still queued on the shared pools; running stragglers end on their own timeouts
+        for future in submitted:
+            future.cancel()
+
+    ordered.sort(key=lambda item: item[0])
+    return [c for _, c in ordered]
+
+
+async def _agather_candidates(query: str, deadline: Deadline) -> list[dict]:
+    """Async variant of _gather_candidates: page fetches share one semaphore on the running loop."""
+    domains = list(get_whitelist().domains)
+    planner = FetchPlanner(query)
+    ordered = []
+    limit = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    async def _fetch(result: dict, order: tuple[int, int]):
+        async with limit:
+            timeout = deadline.remaining(RANKING_RESERVE, cap=FETCH_TIMEOUT)
+            if not timeout:
+                return
+            article = await aextract_article_text(result["url"], timeout)
+        candidate = _to_candidate(result, article)
+        if candidate:
+            ordered.append((order, candidate))
+
+    def _start(batch) -> list[asyncio.Task]:
+        return [asyncio.create_task(_fetch(result, order)) for order, result in batch]
+
+    # DDGS calls are already bounded by the shared search pool
+    combined = asyncio.create_task(asearch_whitelisted(
+        query, domains, max_results=20, timeout=deadline.whole_seconds(RANKING_RESERVE)
+    ))
+    done, _ = await asyncio.wait({combined}, timeout=deadline.remaining(RANKING_RESERVE))
+    if done:
+        fetches = _start(planner.offer(0, combined.result()))
+    else:
+        combined.cancel()
+        fetches = []
+
+    searches = {}
+    if not deadline.expired(RANKING_RESERVE):
+        wanted = set(planner.phase2_domains(domains))
+        search_timeout = deadline.whole_seconds(RANKING_RESERVE)
+        for i, domain in enumerate(domains, 1):
+            if domain in wanted:
+                searches[asyncio.create_task(
+                    asearch_domain(query, domain, max_results=3, timeout=search_timeout)
+                )] = i
+
+    pending = set(searches)
+    while pending:
+        done, pending = await asyncio.wait(
+            pending, timeout=deadline.remaining(RANKING_RESERVE), return_when=asyncio.FIRST_COMPLETED
+        )
+        if not done:
+            break
+        for task in done:
+            fetches.extend(_start(planner.offer(searches[task], task.result())))
+    for task in pending:
+        task.cancel()
+    if not deadline.expired(RANKING_RESERVE):
+        fetches.extend(_start(planner.after_searches()))
+
+    while fetches:
+        _, pending = await asyncio.wait(fetches, timeout=deadline.remaining(RANKING_RESERVE))
+        if pending:
+            for task in pending:
+                task.cancel()
+            break
+        fetches = _start(planner.top_up(len(ordered)))
+
+    ordered.sort(key=lambda item: item[0])
+    return [c for _, c in ordered]
+
+
+def _select_sources(query: str, candidates: list[dict], deadline: Deadline, top_n: int = 5) -> list[dict]:
+    """Shortlist candidates locally with BM25, then let Gemini pick the top_n.
+
+    If the deadline has already passed the BM25 order is used as is.
+    """
+    with span("rank", candidates=len(candidates)) as s:
+        shortlist, scores = prerank(query, candidates, PRERANK_SIZE)
+        if FAST_RANKING and has_clear_margin(scores, top_n, FAST_RANKING_MARGIN):
+            s["method"] = "bm25"
+            return shortlist[:top_n]
+        timeout = deadline.remaining(cap=RANKING_TIMEOUT)
+        if not timeout:
+            s["method"] = "bm25_deadline"
+            return shortlist[:top_n]
+        s["method"] = "gemini"
+        return _rank_by_relevance(query, shortlist, top_n, timeout)
+
+
+async def _aselect_sources(query: str, candidates: list[dict], deadline: Deadline, top_n: int = 5) -> list[dict]:
+    """Async variant of _select_sources."""
+    with span("rank", candidates=len(candidates)) as s:
+        shortlist, scores = prerank(query, candidates, PRERANK_SIZE)
+        if FAST_RANKING and has_clear_margin(scores, top_n, FAST_RANKING_MARGIN):
+            s["method"] = "bm25"
+            return shortlist[:top_n]
+        timeout = deadline.remaining(cap=RANKING_TIMEOUT)
+        if not timeout:
+            s["method"] = "bm25_deadline"
+            return shortlist[:top_n]
+        s["method"] = "gemini"
+        return await _arank_by_relevance(query, shortlist, top_n, timeout)
+
+
+def _build_ranking_prompt(query: str, candidates: list[dict], top_n: int) -> str:
     article_list = []
     for i, c in enumerate(candidates):
         preview = c["content"][:800].replace("\n", " ")
         article_list.append(f"[{i+1}] {c['title']}\n{preview}")
     articles_text = "\n\n".join(article_list)
 
-    prompt = f"""\
+    return f"""\
 User's question: "{query}"
 
 Below are {len(candidates)} articles. Select up to {top_n} articles that actually discuss the topic the user is asking about.
@@ -99,57 +327,65 @@ IMPORTANT:
 Articles:
 {articles_text}"""
 
-    try:
-        resp = _get_client().models.generate_content(
-            model="gemini-3.1-pro-preview",
-            contents=prompt,
-            config=genai.types.GenerateContentConfig(
-                temperature=0.0,
-                max_output_tokens=256,
-            ),
-        )
-        text = resp.text or ""
-        picked = []
-        for line in text.strip().split("\n"):
-            nums = re.findall(r'\d+', line)
-            if nums:
-                idx = int(nums[0]) - 1
-                if 0 <= idx < len(candidates) and idx not in [p for p, _ in picked]:
-                    picked.append((idx, candidates[idx]))
-            if len(picked) >= top_n:
-                break
-        if picked:
-            return [c for _, c in picked]
-    except Exception:
-        pass
 
-    # Fallback: return first top_n candidates (search engine order)
+def _parse_ranking(text: str, candidates: list[dict], top_n: int) -> list[dict]:
+    """Turn the ranking model's numbered lines into candidates (falls back to search order)."""
+    picked = []
+    for line in text.strip().split("\n"):
+        nums = re.findall(r'\d+', line)
+        if nums:
+            idx = int(nums[0]) - 1
+            if 0 <= idx < len(candidates) and idx not in [p for p, _ in picked]:
+                picked.append((idx, candidates[idx]))
+        if len(picked) >= top_n:
+            break
+    if picked:
+        return [c for _, c in picked]
+
+    # Fallback: return first top_n candidates (BM25 pre-ranked order)
     return candidates[:top_n]
 
 
-def search_and_summarize(query: str) -> dict:
-    """Search whitelisted sites and return a kid-friendly summary with sources."""
-    seen_urls: set = set()
-
-    # Phase 1: Combined search across all whitelisted domains
-    search_results = search_whitelisted(query, WHITELISTED_DOMAINS, max_results=20)
-    candidates = _fetch_candidates(search_results, seen_urls)
+def _rank_by_relevance(
+    query: str, candidates: list[dict], top_n: int = 5, timeout: float = RANKING_TIMEOUT
+) -> list[dict]:
+    """Use Gemini to pick the most relevant articles for the query."""
+    if len(candidates) <= top_n:
+        return candidates
 
-    # Phase 2: Always search each domain individually for more candidates
-    per_domain_results = search_per_domain(query, WHITELISTED_DOMAINS, results_per_domain=3)
-    extra = _fetch_candidates(per_domain_results, seen_urls)
-    candidates.extend(extra)
+    prompt = _build_ranking_prompt(query, candidates, top_n)
+    with span("rank.gemini", model=RANKING_MODEL, prompt_chars=len(prompt)) as s:
+        try:
+            resp = scheduler.generate(_get_client(), RANKING_MODEL, prompt, RANKING_CONFIG, RANKING, timeout)
+            text = resp.text or ""
+        except Exception as e:
+            s["error"] = describe(e)
+            text = ""
+        s["response_chars"] = len(text)
+    return _parse_ranking(text, candidates, top_n)
+
+
+async def _arank_by_relevance(
+    query: str, candidates: list[dict], top_n: int = 5, timeout: float = RANKING_TIMEOUT
+) -> list[dict]:
+    """Async variant of _rank_by_relevance."""
+    if len(candidates) <= top_n:
+        return candidates
 
-    if not candidates:
-        return {
-            "summary": "I couldn't find any information about that on our safe websites. "
-                       "Try asking your question in a different way!",
-            "sources": [],
-        }
+    prompt = _build_ranking_prompt(query, candidates, top_n)
+    with span("rank.gemini", model=RANKING_MODEL, prompt_chars=len(prompt)) as s:
+        try:
+            resp = await scheduler.agenerate(_get_client(), RANKING_MODEL, prompt, RANKING_CONFIG, RANKING, timeout)
+            text = resp.text or ""
+        except Exception as e:
+            s["error"] = describe(e)
+            text = ""
+        s["response_chars"] = len(text)
+    return _parse_ranking(text, candidates, top_n)
 
-    # Use Gemini to pick the most relevant articles
-    good = _rank_by_relevance(query, candidates)
 
+def _build_answer_prompt(query: str, good: list[dict]) -> tuple[list[dict], str]:
+    """Return the source list and the answer prompt for the chosen candidates."""
     sources = []
     context_parts = []
     for c in good:
@@ -164,14 +400,7 @@ def search_and_summarize(query: str) -> dict:
             f"[{len(sources)}] {c['title']} ({c['resolved_url']})\n{c['content']}"
         )
 
-    if not sources:
-        return {
-            "summary": "I found some pages but couldn't read them properly. "
-                       "Try asking your question in a different way!",
-            "sources": [],
-        }
-
-    # Step 3: Build context and call Gemini (no web search — context only)
+    # Build context and call Gemini (no web search — context only)
     context = "\n\n---\n\n".join(context_parts)
 
     prompt = f"""Question: {query}
@@ -180,46 +409,235 @@ Sources:
 {context}
 
 Using ONLY the sources above, write a kid-friendly answer. Cite sources with [1], [2], etc."""
+    if SINGLE_CALL_SOURCE_SUMMARIES:
+        prompt += f"""
 
-    response = _get_client().models.generate_content(
-        model=MODEL_NAME,
-        contents=prompt,
-        config=genai.types.GenerateContentConfig(
-            system_instruction=SYSTEM_PROMPT,
-            temperature=0.3,
-            max_output_tokens=16384,
-        ),
-    )
+After the answer, write a line containing only {SOURCE_SUMMARY_MARKER} and then a 2-3 sentence summary (30-50 words) for EACH source explaining what key facts it provided for the answer. Be specific — mention actual facts, numbers, or details from your answer. Write one summary per line for every single source, in this exact format:
+[1] summary text
+[2] summary text"""
+    return sources, prompt
+
+
+def _finish_answer(text: str, sources: list[dict]) -> str:
+    """Split the model output into the answer and any inline source summaries.
+
+    Returns the answer with normalized citations; summaries found after the
+    marker line are copied onto the sources.
+    """
+    answer, marker, trailer = text.partition(SOURCE_SUMMARY_MARKER)
+    if marker:
+        _apply_source_summaries(trailer, sources)
+        answer = answer.rstrip()
+    return _normalize_citations(answer)
+
+
+def _missing_source_summaries(sources: list[dict]) -> bool:
+    return any(not s.get("description") for s in sources)
+
+
+def _stream_answer_text(chunks):
+    """Yield answer text from a stream of chunk strings, stopping at the summary marker.
+
+    A tail that might be the start of the marker is held back until the next
+    chunk shows whether it is.
+    """
+    full = ""
+    emitted = 0
+    holdback = len(SOURCE_SUMMARY_MARKER) - 1
+    for chunk in chunks:
+        full += chunk
+        marker_pos = full.find(SOURCE_SUMMARY_MARKER, max(0, emitted - holdback))
+        if marker_pos >= 0:
+            if marker_pos > emitted:
+                yield full[emitted:marker_pos]
+            emitted = len(full)
+            holdback = 0
+            continue
+        if holdback:
+            safe_end = len(full) - holdback
+            if safe_end > emitted:
+                yield full[emitted:safe_end]
+                emitted = safe_end
+    if holdback and emitted < len(full):
+        yield full[emitted:]
 
-    summary = response.text or ""
 
-    # Step 4: Normalize citations — convert [1, 3, 5] to [1] [3] [5]
+def _normalize_citations(summary: str) -> str:
+    """Convert [1, 3, 5] to [1] [3] [5]."""
+
     def _expand_citations(m):
         nums = re.findall(r'\d+', m.group(1))
         return " ".join(f"[{n}]" for n in nums)
 
-    summary = re.sub(r'\[([\d,\s]+)\]', _expand_citations, summary)
+    # Keep all sources — don't filter uncited ones. Sources are already
+    # numbered [1]-[5] matching the context, no renumbering needed.
+    return re.sub(r'\[([\d,\s]+)\]', _expand_citations, summary)
+
+
+def search_and_summarize(query: str, deadline: float | None = None) -> dict:
+    """Search whitelisted sites and return a kid-friendly summary with sources.
+
+    deadline is the seconds allowed for searching, fetching and ranking
+    (default QUERY_DEADLINE; 0 means no limit). Raises BusyError when too
+    many other queries are already running or waiting.
+    """
+    for kind, payload in search_and_summarize_stream(query, deadline):
+        if kind == "done":
+            return payload
+    raise RuntimeError("search_and_summarize_stream ended without a result")
+
+
+def search_and_summarize_stream(query: str, deadline: float | None = None):
+    """Streaming variant of search_and_summarize for the UI.
+
+    Yields ("sources", sources) as soon as the sources are chosen, then
+    ("chunk", text) for each piece of the answer as Gemini writes it, and
+    finally ("done", {"summary", "sources"}). Source descriptions are filled
+    in just before "done". Cached answers are replayed as a single chunk.
+    Concurrent calls for the same normalized query share one pipeline run,
+    each replaying its events from the start.
+    """
+    with span("query", query_chars=len(query)) as trace:
+        cached = answer_cache.get(query)
+        trace["cached"] = cached is not None
+        if cached is not None:
+            yield "sources", cached["sources"]
+            yield "chunk", cached["summary"]
+            yield "done", cached
+            return
+
+        # Sessions asking the same question at once share one pipeline run
+        with track_usage() as usage:
+            events, trace["coalesced"] = _queries.stream(
+                normalize_query(query), answer_pool, _answer_events, query, deadline,
+            )
+        for kind, payload in events:
+            if kind == "done":
+                trace["sources"] = len(payload["sources"])
+                if not trace["coalesced"]:
+                    trace.update(usage)
+            yield kind, copy.deepcopy(payload) if trace["coalesced"] else payload
+
+
+def _answer_events(query: str, deadline: float | None):
+    # Admitted in the caller's thread, so only running queries hold an answer_pool
+    # thread; the deadline starts once the query is admitted, not while it waits
+    slot = ExitStack()
+    slot.enter_context(admission.admit())
+    return _holding(slot, _admitted_answer_events(query, Deadline(QUERY_DEADLINE if deadline is None else deadline)))
+
+
+def _holding(slot: ExitStack, events):
+    with slot:
+        yield from events
+
+
+def _admitted_answer_events(query: str, clock: Deadline):
+    with span("gather") as s:
+        candidates = _gather_candidates(query, clock)
+        s["candidates"] = len(candidates)
+
+    if not candidates:
+        yield "done", {"summary": NO_RESULTS_MESSAGE, "sources": []}
+        return
 
-    # Step 5: Normalize citations (keep all sources — don't filter uncited ones)
-    # Sources are already numbered [1]-[5] matching the context, no renumbering needed
+    good = _select_sources(query, candidates, clock)
 
-    # Step 5: Generate per-source summaries
-    _generate_source_summaries(summary, sources)
+    sources, prompt = _build_answer_prompt(query, good)
+    if not sources:
+        yield "done", {"summary": UNREADABLE_MESSAGE, "sources": []}
+        return
+    yield "sources", sources
+
+    parts = []
+
+    def _chunks():
+        for chunk in scheduler.generate_stream(
+            _get_client(), MODEL_NAME, prompt, ANSWER_CONFIG, ANSWER, ANSWER_TIMEOUT
+        ):
+            if chunk.text:
+                parts.append(chunk.text)
+                yield chunk.text
+
+    with span("answer", model=MODEL_NAME, prompt_chars=len(prompt)) as s:
+        for text in _stream_answer_text(_chunks()):
+            yield "chunk", text
+        s["response_chars"] = sum(map(len, parts))
+    summary = _finish_answer("".join(parts), sources)
+
+    # Separate summaries call only if the inline ones were missing or incomplete
+    if _missing_source_summaries(sources):
+        _generate_source_summaries(summary, sources)
+
+    result = {"summary": summary, "sources": sources}
+    answer_cache.put(query, result)
+    yield "done", result
+
+
+async def asearch_and_summarize(query: str, deadline: float | None = None) -> dict:
+    """Async variant of search_and_summarize, driven entirely by the running event loop.
+
+    Page fetches use a client bound to the running loop; await
+    content_extractor.aclose_http_client() before the loop ends.
+    """
+    with span("query", query_chars=len(query)) as trace:
+        cached = answer_cache.get(query)
+        trace["cached"] = cached is not None
+        if cached is not None:
+            return cached
+        with track_usage() as usage:
+            result, trace["coalesced"] = await _queries.ado(
+                normalize_query(query), _aadmitted_search_and_summarize, query, deadline
+            )
+        trace["sources"] = len(result["sources"])
+        if not trace["coalesced"]:
+            trace.update(usage)
+        if trace["coalesced"]:
+            return copy.deepcopy(result)
+        if result["sources"]:
+            answer_cache.put(query, result)
+        return result
+
+
+async def _aadmitted_search_and_summarize(query: str, deadline: float | None) -> dict:
+    async with admission.aadmit():
+        return await _asearch_and_summarize(query, Deadline(QUERY_DEADLINE if deadline is None else deadline))
+
+
+async def _asearch_and_summarize(query: str, clock: Deadline) -> dict:
+    with span("gather") as s:
+        candidates = await _agather_candidates(query, clock)
+        s["candidates"] = len(candidates)
 
-    return {"summary": summary, "sources": sources}
+    if not candidates:
+        return {"summary": NO_RESULTS_MESSAGE, "sources": []}
 
+    good = await _aselect_sources(query, candidates, clock)
 
-def _generate_source_summaries(answer: str, sources: list[dict]):
-    """Use Gemini to generate a kid-friendly summary for each source."""
+    sources, prompt = _build_answer_prompt(query, good)
     if not sources:
-        return
+        return {"summary": UNREADABLE_MESSAGE, "sources": []}
 
+    with span("answer", model=MODEL_NAME, prompt_chars=len(prompt)) as s:
+        response = await scheduler.agenerate(
+            _get_client(), MODEL_NAME, prompt, ANSWER_CONFIG, ANSWER, ANSWER_TIMEOUT
+        )
+        s["response_chars"] = len(response.text or "")
+    summary = _finish_answer(response.text or "", sources)
+
+    if _missing_source_summaries(sources):
+        await _agenerate_source_summaries(summary, sources)
+
+    return {"summary": summary, "sources": sources}
+
+
+def _build_source_summary_prompt(answer: str, sources: list[dict]) -> str:
     source_list = "\n".join(
         f"[{i+1}] {s['title']} ({s.get('resolved_url', s['url'])})"
         for i, s in enumerate(sources)
     )
 
-    prompt = f"""\
+    return f"""\
 Based on this answer about a kid's question:
 
 \"\"\"{answer}\"\"\"
@@ -231,25 +649,57 @@ These are the sources used. Write a 2-3 sentence summary (30-50 words) for EACH
 Sources:
 {source_list}"""
 
-    try:
-        resp = _get_client().models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
-            config=genai.types.GenerateContentConfig(
-                temperature=0.3,
-                max_output_tokens=8192,
-            ),
-        )
-        text = resp.text or ""
-
-        for line in text.strip().split("\n"):
-            match = re.match(r'\[(\d+)\]\s*(.+)', line.strip())
-            if match:
-                idx = int(match.group(1)) - 1
-                desc = match.group(2).strip()
-                if 0 <= idx < len(sources):
-                    sources[idx]["description"] = desc
-    except Exception:
-        for src in sources:
-            if not src.get("description"):
-                src["description"] = src.get("title", "Source article")
+
+def _apply_source_summaries(text: str, sources: list[dict]):
+    """Copy "[n] summary" lines onto the matching sources' descriptions."""
+    for line in text.strip().split("\n"):
+        match = re.match(r'\[(\d+)\]\s*(.+)', line.strip())
+        if match:
+            idx = int(match.group(1)) - 1
+            desc = match.group(2).strip()
+            if 0 <= idx < len(sources):
+                sources[idx]["description"] = desc
+
+
+def _fallback_source_summaries(sources: list[dict]):
+    for src in sources:
+        if not src.get("description"):
+            src["description"] = src.get("title", "Source article")
+
+
+def _generate_source_summaries(answer: str, sources: list[dict]):
+    """Use Gemini to generate a kid-friendly summary for each source."""
+    if not sources:
+        return
+
+    prompt = _build_source_summary_prompt(answer, sources)
+    with span("source_summaries", model=SOURCE_SUMMARY_MODEL, prompt_chars=len(prompt)) as s:
+        try:
+            resp = scheduler.generate(
+                _get_client(), SOURCE_SUMMARY_MODEL, prompt, SOURCE_SUMMARY_CONFIG,
+                SOURCE_SUMMARIES, SOURCE_SUMMARY_TIMEOUT,
+            )
+            s["response_chars"] = len(resp.text or "")
+            _apply_source_summaries(resp.text or "", sources)
+        except Exception as e:
+            s["error"] = describe(e)
+            _fallback_source_summaries(sources)
+
+
+async def _agenerate_source_summaries(answer: str, sources: list[dict]):
+    """Async variant of _generate_source_summaries."""
+    if not sources:
+        return
+
+    prompt = _build_source_summary_prompt(answer, sources)
+    with span("source_summaries", model=SOURCE_SUMMARY_MODEL, prompt_chars=len(prompt)) as s:
+        try:
+            resp = await scheduler.agenerate(
+                _get_client(), SOURCE_SUMMARY_MODEL, prompt, SOURCE_SUMMARY_CONFIG,
+                SOURCE_SUMMARIES, SOURCE_SUMMARY_TIMEOUT,
+            )
+            s["response_chars"] = len(resp.text or "")
+            _apply_source_summaries(resp.text or "", sources)
+        except Exception as e:
+            s["error"] = describe(e)
+            _fallback_source_summaries(sources)
@@ -0,0 +1,40 @@
+"""HTML parser backends for content extraction.
+
+All backends build a BeautifulSoup tree, so the extractors' selector logic and
+output fields are identical; only the tree builder differs. lxml (C) is several
+times faster than Python's html.parser and is used whenever it is installed.
+Run benchmarks/parser_benchmark.py to compare backends on recorded pages.
+"""
+from bs4 import BeautifulSoup, FeatureNotFound
+
+from config import HTML_PARSER
+
+# Fastest first; "auto" picks the first one that is installed
+BACKENDS = ("lxml", "html.parser")
+
+
+def available_backends() -> list[str]:
+    available = []
+    for backend in BACKENDS:
+        try:
+            BeautifulSoup("", backend)
+        except FeatureNotFound:
+            continue
+        available.append(backend)
+    return available
+
+
+def _resolve(name: str) -> str:
+    if name == "auto":
+        return available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML parser {name!r}; choose from auto, {', '.join(BACKENDS)}")
+    return name
+
+
+DEFAULT_BACKEND = _resolve(HTML_PARSER)
+
+
+def make_soup(html: str, backend: str | None = None) -> BeautifulSoup:
+    """Parse HTML with the configured backend (or an explicit one, for benchmarks)."""
+    return BeautifulSoup(html, backend or DEFAULT_BACKEND)
@@ -0,0 +1,80 @@
+"""Local BM25 scoring used to shortlist candidates before the LLM ranking call."""
+import math
+from collections import Counter
+
+from services.near_duplicates import distinct
+from services.text_utils import content_words, stem, tokenize
+
+# Okapi BM25 parameters
+K1 = 1.5
+B = 0.75
+# Titles are short but telling; count their words this many times
+TITLE_WEIGHT = 2
+
+
+def query_terms(query: str) -> list[str]:
+    """Distinct stemmed content words of a query (all words if it is only stop words)."""
+    return list(dict.fromkeys(stem(t) for t in content_words(query) or tokenize(query)))
+
+
+def doc_terms(text: str) -> list[str]:
+    return [stem(t) for t in tokenize(text)]
+
+
+def bm25_scores(query: str, docs: list[str]) -> list[float]:
+    """Score each document against the query with Okapi BM25."""
+    terms = query_terms(query)
+    doc_counts = [Counter(doc_terms(d)) for d in docs]
+    if not terms or not docs:
+        return [0.0] * len(docs)
+
+    lengths = [sum(c.values()) for c in doc_counts]
+    avg_len = (sum(lengths) / len(lengths)) or 1.0
+    n = len(docs)
+    idf = {}
+    for t in terms:
+        df = sum(1 for c in doc_counts if t in c)
+        idf[t] = math.log((n - df + 0.5) / (df + 0.5) + 1.0)
+
+    scores = []
+    for counts, length in zip(doc_counts, lengths):
+        score = 0.0
+        norm = K1 * (1 - B + B * length / avg_len)
+        for t in terms:
+            tf = counts.get(t, 0)
+            if tf:
+                score += idf[t] * tf * (K1 + 1) / (tf + norm)
+        scores.append(score)
+    return scores
+
+
+def prerank(query: str, candidates: list[dict], keep: int) -> tuple[list[dict], list[float]]:
+    """Return the `keep` best candidates by BM25 over title + content, with their scores.
+
+    Ties (including all-zero scores) keep search order. Of near-duplicate
+    articles (mirrored text) only the best-scoring copy is kept.
+    """
+    docs = [
+        " ".join([c.get("title", "")] * TITLE_WEIGHT + [c.get("content", "")])
+        for c in candidates
+    ]
+    scores = bm25_scores(query, docs)
+    order = sorted(range(len(candidates)), key=lambda i: -scores[i])
+    shortlist = distinct([candidates[i] for i in order])[:keep]
+    score_of = {id(candidates[i]): scores[i] for i in order}
+    return shortlist, [score_of[id(c)] for c in shortlist]
+
+
+def has_clear_margin(scores: list[float], top_n: int, margin: float) -> bool:
+    """True when the top_n scores (sorted descending) stand clearly above the rest."""
+    if len(scores) <= top_n:
+        return bool(scores) and scores[-1] > 0
+    return scores[top_n - 1] > 0 and scores[top_n - 1] >= margin * scores[top_n]
+
+
+def term_coverage(terms: list[str], text: str) -> float:
+    """Fraction of the (stemmed) query terms that appear in text."""
+    if not terms:
+        return 0.0
+    present = set(doc_terms(text))
+    return sum(1 for t in terms if t in present) / len(terms)
@@ -0,0 +1,46 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries expire after ttl seconds."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_with_age(self, key) -> tuple[object, float] | None:
+        """Return (value, age in seconds) for a live entry, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            age = time.monotonic() - stored_at
+            if age >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value, age
+
+    def get(self, key):
+        entry = self.get_with_age(key)
+        return entry[0] if entry else None
+
+    def set(self, key, value, age: float = 0.0):
+        """Store a value; age lets entries promoted from another tier keep their expiry."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() - age, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,46 @@
+"""Near-duplicate detection for candidate articles, with 128-bit SimHash over word shingles.
+
+Several whitelisted search sites mirror the same encyclopedia text, so one
+article can come back several times under different URLs. Two texts whose
+fingerprints differ in at most MAX_DISTANCE bits share roughly nine in ten
+of their SHINGLE_WORDS-word shingles; unrelated texts differ in about half
+the bits.
+"""
+from hashlib import blake2b
+
+from services.text_utils import tokenize
+
+SHINGLE_WORDS = 3
+MAX_DISTANCE = 18
+# Shorter texts (bare search snippets) are never treated as duplicates
+MIN_WORDS = 40
+
+
+def simhash(text: str) -> int | None:
+    """128-bit SimHash of the text's word shingles (None if it is too short to judge)."""
+    words = tokenize(text)
+    if len(words) < MIN_WORDS:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    # counts[i] is how many more shingle hashes have bit i set than clear
+    counts = [0] * 128
+    for shingle in shingles:
+        h = int.from_bytes(blake2b(shingle.encode(), digest_size=16).digest(), "big")
+        for i in range(128):
+            counts[i] += 1 if h >> i & 1 else -1
+    return sum(1 << i for i, count in enumerate(counts) if count > 0)
+
+
+def distinct(candidates: list[dict]) -> list[dict]:
+    """Candidates minus near-duplicates of an earlier one, so list the preferred copy first."""
+    kept, fingerprints = [], []
+    for candidate in candidates:
+        fingerprint = simhash(candidate.get("content", ""))
+        if fingerprint is not None and any(
+            (fingerprint ^ other).bit_count() <= MAX_DISTANCE for other in fingerprints
+        ):
+            continue
+        kept.append(candidate)
+        if fingerprint is not None:
+            fingerprints.append(fingerprint)
+    return kept
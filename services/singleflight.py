@@ -0,0 +1,153 @@
+"""Coalesce identical in-flight calls: the first caller runs, the rest share its outcome.
+
+    _pages = SingleFlight()
+    page, shared = _pages.do(canonical_url(url), _extract, url)
+
+While a call for a key is running, later callers with the same key wait for
+it and get the same result (or the same exception) instead of starting
+their own. Nothing is kept once it finishes; that is the caches' job. do()
+and ado() callers share one flight per key; stream() flights are keyed
+separately. If the leading caller is cancelled or stopped before
+finishing, its followers start over instead of seeing the cancellation.
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future
+
+
+class _Abandoned(Exception):
+    """The leading caller went away before its call finished."""
+
+
+class _Stream:
+    def __init__(self):
+        self.items: list = []
+        self.finished = False
+        self.error: BaseException | None = None
+        self.changed = threading.Condition()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[object, Future] = {}
+        self._streams: dict[object, _Stream] = {}
+
+    def do(self, key, fn, *args, **kwargs) -> tuple[object, bool]:
+        """Run fn(*args, **kwargs) unless a call for key is in flight; returns (result, shared)."""
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    return future.result(), True
+                except _Abandoned:
+                    continue
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                self._land(key, future, error=exc)
+                raise
+            except BaseException:
+                self._land(key, future, error=_Abandoned())
+                raise
+            self._land(key, future, result=result)
+            return result, False
+
+    async def ado(self, key, fn, *args, **kwargs) -> tuple[object, bool]:
+        """Async variant of do(); fn is a coroutine function."""
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    return await asyncio.wrap_future(future), True
+                except _Abandoned:
+                    continue
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as exc:
+                self._land(key, future, error=exc)
+                raise
+            except BaseException:
+                self._land(key, future, error=_Abandoned())
+                raise
+            self._land(key, future, result=result)
+            return result, False
+
+    def stream(self, key, executor, fn, *args, **kwargs) -> tuple[object, bool]:
+        """Iterate fn(*args, **kwargs) once per key, on an executor thread.
+
+        Returns (items, shared). The leading caller calls fn itself and only
+        hands the iterator it returns to the executor, so whatever fn does
+        first (e.g. waiting for admission) costs no thread; if that raises,
+        the leader and everyone who joined meanwhile get the exception. Each
+        caller's iterator yields everything produced so far, then the rest as
+        it arrives, and re-raises the iteration's exception, if any. The run
+        carries on if callers stop reading.
+        """
+        with self._lock:
+            flight = self._streams.get(key)
+            shared = flight is not None
+            if not shared:
+                flight = self._streams[key] = _Stream()
+        if not shared:
+            try:
+                items = fn(*args, **kwargs)
+                executor.submit(contextvars.copy_context().run, self._produce, key, flight, items)
+            except BaseException as exc:
+                self._finish(key, flight, exc)
+                raise
+        return self._follow(flight), shared
+
+    def _join(self, key) -> tuple[Future, bool]:
+        """The future for key's flight, and whether the caller leads it."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = Future()
+            # Running futures can't be cancelled, so a follower giving up can't cancel the flight
+            future.set_running_or_notify_cancel()
+            return future, True
+
+    def _land(self, key, future: Future, result=None, error: BaseException | None = None):
+        with self._lock:
+            del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _produce(self, key, flight: _Stream, items):
+        error = None
+        try:
+            for item in items:
+                with flight.changed:
+                    flight.items.append(item)
+                    flight.changed.notify_all()
+        except BaseException as exc:
+            error = exc
+        finally:
+            self._finish(key, flight, error)
+
+    def _finish(self, key, flight: _Stream, error: BaseException | None):
+        with self._lock:
+            del self._streams[key]
+        with flight.changed:
+            flight.error = error
+            flight.finished = True
+            flight.changed.notify_all()
+
+    @staticmethod
+    def _follow(flight: _Stream):
+        seen = 0
+        while True:
+            with flight.changed:
+                flight.changed.wait_for(lambda: len(flight.items) > seen or flight.finished)
+                items, finished = flight.items[seen:], flight.finished
+            yield from items
+            seen += len(items)
+            if finished:
+                if flight.error is not None:
+                    raise flight.error
+                return
@@ -0,0 +1,28 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized: set[str] = set()
+
+
+def thread_connection(path: str, schema: str) -> sqlite3.Connection:
+    """Return this thread's WAL-mode connection to a cache database, creating the schema once."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5.0)
+        conn.row_factory = sqlite3.Row
+        with _init_lock:
+            if path not in _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(schema)
+                conn.commit()
+                _initialized.add(path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conns[path] = conn
+    return conn
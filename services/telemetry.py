@@ -0,0 +1,190 @@
+"""Timing spans for each stage of a query, exported as JSON logs and Prometheus text.
+
+    with span("fetch", domain=host) as s:
+        ...
+        s["status"] = resp.status_code
+
+A span records its duration, attributes and, if an exception escapes it, the
+error (the exception is re-raised). Code that handles a failure itself can
+set s["error"] = describe(exc) so it is still counted. Spans opened inside another span on the
+same query share its trace_id; use submit() to carry that into pool threads
+(asyncio tasks and asyncio.to_thread carry it automatically).
+
+Every finished span is added to per-stage histograms. With TRACE_LOG set each
+span is also logged as one JSON line on the "kidsearch.trace" logger, and
+functions registered with add_listener() get the same record as a dict. The
+metrics are written to METRICS_FILE after each query and/or served at
+http://METRICS_BIND:METRICS_PORT/metrics.
+"""
+import contextvars
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_BIND, METRICS_FILE, METRICS_PORT, TRACE_LOG
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current: contextvars.ContextVar[tuple[str, str] | None] = contextvars.ContextVar(
+    "telemetry_span", default=None
+)  # (trace_id, span_id) of the innermost open span
+
+_listeners: list = []
+
+_trace_log = logging.getLogger("kidsearch.trace")
+if TRACE_LOG and not _trace_log.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    _trace_log.addHandler(_handler)
+    _trace_log.setLevel(logging.INFO)
+    _trace_log.propagate = False
+
+
+class _Metrics:
+    """Per-stage duration histograms and error counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: dict[str, dict] = {}
+
+    def observe(self, stage: str, seconds: float, error: bool):
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = {
+                    "buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0, "errors": 0,
+                }
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    stats["buckets"][i] += 1
+            stats["sum"] += seconds
+            stats["count"] += 1
+            stats["errors"] += error
+
+    def render(self) -> str:
+        """The metrics in Prometheus text exposition format."""
+        with self._lock:
+            stages = {name: dict(s, buckets=list(s["buckets"])) for name, s in sorted(self._stages.items())}
+        lines = [
+            "# HELP kidsearch_stage_seconds Time spent in each query pipeline stage.",
+            "# TYPE kidsearch_stage_seconds histogram",
+        ]
+        for name, s in stages.items():
+            for bound, count in zip(BUCKETS, s["buckets"]):
+                lines.append(f'kidsearch_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'kidsearch_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {s["count"]}')
+            lines.append(f'kidsearch_stage_seconds_sum{{stage="{name}"}} {s["sum"]:.6f}')
+            lines.append(f'kidsearch_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+        lines += [
+            "# HELP kidsearch_stage_errors_total Stage runs that ended in an exception.",
+            "# TYPE kidsearch_stage_errors_total counter",
+        ]
+        for name, s in stages.items():
+            lines.append(f'kidsearch_stage_errors_total{{stage="{name}"}} {s["errors"]}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = _Metrics()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block as one pipeline stage; yields a dict for attributes set along the way."""
+    parent = _current.get()
+    trace_id = parent[0] if parent else uuid.uuid4().hex[:16]
+    span_id = uuid.uuid4().hex[:8]
+    token = _current.set((trace_id, span_id))
+    started = time.monotonic()
+    error = None
+    try:
+        yield attrs
+    except GeneratorExit:
+        raise
+    except BaseException as exc:
+        error = describe(exc)
+        raise
+    finally:
+        duration = time.monotonic() - started
+        try:
+            _current.reset(token)
+        except ValueError:
+            # A generator closed from another context; nothing to restore
+            pass
+        if error:
+            attrs["error"] = error
+        metrics.observe(name, duration, "error" in attrs)
+        if TRACE_LOG or _listeners:
+            record = {
+                "span": name, "trace_id": trace_id, "span_id": span_id,
+                "parent_id": parent[1] if parent else None,
+                "ms": round(duration * 1000, 1), **attrs,
+            }
+            for listener in _listeners:
+                listener(record)
+            if TRACE_LOG:
+                _trace_log.info(json.dumps(record, default=str))
+        if parent is None and METRICS_FILE:
+            write_metrics_file()
+
+
+def add_listener(fn):
+    """Call fn(record) for every finished span (record is the dict TRACE_LOG would log)."""
+    _listeners.append(fn)
+
+
+def describe(exc: BaseException) -> str:
+    return f"{type(exc).__name__}: {exc}"
+
+
+def submit(pool, fn, *args, **kwargs):
+    """pool.submit() that runs fn inside the caller's trace."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def write_metrics_file(path: str = ""):
+    """Atomically replace METRICS_FILE (or path) with the current metrics."""
+    path = path or METRICS_FILE
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False, suffix=".tmp") as f:
+            f.write(metrics.render())
+        os.replace(f.name, path)
+    except OSError:
+        pass
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve_metrics(host: str, port: int):
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logging.getLogger(__name__).warning("Metrics endpoint not started on %s:%d: %s", host, port, e)
+        return
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+
+
+if METRICS_PORT:
+    _serve_metrics(METRICS_BIND, METRICS_PORT)
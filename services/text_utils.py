@@ -0,0 +1,59 @@
+import re
+import unicodedata
+
+# Words too common to help rank or pick pages for a query. Question words
+# (what/why/how/when/where/who/which) are deliberately kept: "why do volcanoes
+# erupt" and "when do volcanoes erupt" are different questions.
+STOP_WORDS = frozenset("""
+a an the and or but of to in on at for from by with about into as
+is are was were be been being am do does did can could would should will shall may might must
+i me my we us our you your it its they them their he she his her this that these those there
+please tell explain show know want like just really very some any
+""".split())
+
+# The much shorter list normalize_query() drops. Its key is shared by the
+# answer cache and query coalescing, so only articles and pure filler go:
+# pronouns, prepositions, words that double as nouns ("us", "may", "can")
+# and verbs that carry tense ("was", "is", "did") can all change the answer.
+FILLER_WORDS = frozenset("""
+a an the do does please tell explain show know want just really very
+""".split())
+
+QUESTION_WORDS = frozenset("what why how when where who whom whose which".split())
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens with accents folded and punctuation dropped."""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return _WORD_RE.findall(folded)
+
+
+def content_words(text: str) -> list[str]:
+    """Tokens of text with stop words removed (for ranking, not for cache keys)."""
+    return [t for t in tokenize(text) if t not in STOP_WORDS]
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a search query, used as a cache and coalescing key.
+
+    Case, punctuation, extra whitespace and FILLER_WORDS are removed, so
+    "How do Volcanoes work?" and "how   volcanoes work" share a key.
+    """
+    tokens = tokenize(query)
+    return " ".join([t for t in tokens if t not in FILLER_WORDS] or tokens)
+
+
+def stem(word: str) -> str:
+    """Very light plural stripping so "volcanoes" matches "volcano" in ranking."""
+    if len(word) <= 3 or word.endswith("ss"):
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "shes", "ches", "xes", "zes", "oes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
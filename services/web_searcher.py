@@ -1,63 +1,163 @@
+import asyncio
+import math
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
-from urllib.parse import urlparse
 
 from ddgs import DDGS
+from ddgs.exceptions import RatelimitException, TimeoutException
+
+from config import SEARCH_CACHE_MAX_AGE, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL, get_whitelist
+from services.domain_health import fetch_health, search_health
+from services.memory_cache import TTLCache
+from services.telemetry import span, submit
+from services.text_utils import normalize_query
+from services.workers import search_pool
+
+# Search results are served from cache for SEARCH_CACHE_MAX_AGE; past
+# SEARCH_CACHE_TTL they are refreshed in the background while still served.
+_cache = TTLCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_MAX_AGE)
+_refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="search-refresh")
+_refreshing: set = set()
+_refreshing_lock = threading.Lock()
+
+# ddgs's own default timeout (seconds), the ceiling for adaptive search timeouts
+DDGS_TIMEOUT = 5
+# ddgs raises this for an empty result set; it isn't a failure of the site
+_NO_RESULTS = "No results found."
+# search_health key for the combined search over every site
+COMBINED_SEARCH = "*"
+
+
+def search_whitelisted(
+    query: str, domains: list[str], max_results: int = 20, timeout: int | None = None
+) -> list[dict]:
+    """Search only whitelisted domains using DuckDuckGo site: operator.
+
+    timeout (whole seconds) caps the DuckDuckGo request; None uses the ddgs default.
+    """
+    site_filter = " OR ".join(f"site:{d}" for d in domains)
+    full_query = f"{query} {site_filter}"
 
-from config import load_whitelist
+    def _search(timeout: int | None) -> list[dict]:
+        results = _ddgs(timeout).text(full_query, max_results=max_results)
+        # Post-filter: DuckDuckGo site: operator sometimes leaks non-whitelisted URLs
+        whitelist, allowed = get_whitelist(), set(domains)
+        return [r for r in _parse_results(results) if whitelist.match(r["url"]) in allowed]
 
-# Build a lookup for domains that require path prefix checking
-_SITES = load_whitelist()
-_PATH_PREFIXES = {s["domain"]: s["path_prefix"] for s in _SITES if s.get("path_prefix")}
+    key = (normalize_query(query), tuple(sorted(domains)), max_results)
+    return _cached_search(key, _search, timeout, COMBINED_SEARCH)
 
 
-def _is_whitelisted(url: str, domains: list[str]) -> bool:
-    """Check if a URL belongs to one of the whitelisted domains (with optional path prefix)."""
-    parsed = urlparse(url)
-    netloc = parsed.netloc.lower()
-    # Strip www. prefix for matching (but don't allow arbitrary subdomains like games.*)
-    bare = netloc.removeprefix("www.")
-    for d in domains:
-        if bare == d:
-            # If this domain has a path_prefix requirement, check the path too
-            prefix = _PATH_PREFIXES.get(d)
-            if prefix and not parsed.path.lower().startswith(prefix):
-                return False
-            return True
-    return False
+def search_domain(
+    query: str, domain: str, max_results: int = 3, timeout: int | None = None
+) -> list[dict]:
+    """Search a single whitelisted domain.
 
+    Skipped (returns []) while the domain's search or fetch circuit is open.
+    """
 
-def search_whitelisted(query: str, domains: list[str], max_results: int = 20) -> list[dict]:
-    """Search only whitelisted domains using DuckDuckGo site: operator."""
-    site_filter = " OR ".join(f"site:{d}" for d in domains)
-    full_query = f"{query} {site_filter}"
+    def _search(timeout: int | None) -> list[dict]:
+        results = _ddgs(timeout).text(f"{query} site:{domain}", max_results=max_results)
+        whitelist = get_whitelist()
+        return [r for r in _parse_results(results) if whitelist.match(r["url"]) == domain]
+
+    return _cached_search((normalize_query(query), (domain,), max_results), _search, timeout, domain)
 
-    try:
-        results = DDGS().text(full_query, max_results=max_results)
-    except Exception:
-        results = []
 
-    # Post-filter: DuckDuckGo site: operator sometimes leaks non-whitelisted URLs
-    parsed = _parse_results(results)
-    return [r for r in parsed if _is_whitelisted(r["url"], domains)]
+def _ddgs(timeout: int | None) -> DDGS:
+    return DDGS(timeout=timeout) if timeout else DDGS()
 
 
-def search_per_domain(query: str, domains: list[str], results_per_domain: int = 3) -> list[dict]:
-    """Search each whitelisted domain individually in parallel."""
+def _cached_search(key: tuple, search, timeout: int | None, site: str) -> list[dict]:
+    """Serve search results from cache, refreshing stale entries in the background.
 
-    def _search_one(domain: str) -> list[dict]:
+    Failed searches return [] and are never cached, so a rate-limit error
+    doesn't poison the next query. On a cache miss the search is skipped
+    while site's circuit is open, and its timeout adapts to site's latency.
+    """
+    entry = _cache.get_with_age(key)
+    if entry is not None:
+        results, age = entry
+        if age >= SEARCH_CACHE_TTL:
+            _refresh_in_background(key, search, site)
+        return list(results)
+
+    # No point searching a site whose pages can't be fetched right now
+    if fetch_health.is_open(site) or not search_health.allow(site):
+        return []
+    full_timeout = math.ceil(search_health.timeout(site, DDGS_TIMEOUT))
+    timeout = math.ceil(search_health.timeout(site, timeout or DDGS_TIMEOUT))
+    try:
+        results = _run_search(site, search, timeout, cut_short=timeout < full_timeout)
+    except Exception:
+        return []
+    if results is None:
+        return []
+    _cache.set(key, results)
+    return list(results)
+
+
+def _run_search(site: str, search, timeout: int | None, cut_short: bool = False) -> list[dict] | None:
+    """Run a search, recording its latency and outcome in search_health and a trace span.
+
+    Returns None when DuckDuckGo found nothing (ddgs raises for that).
+    cut_short means the caller's deadline left less than the site's usual
+    timeout; timing out then isn't held against the site.
+    """
+    stage = "search.combined" if site == COMBINED_SEARCH else "search.domain"
+    with span(stage, site=site, timeout=timeout) as s:
+        started = time.monotonic()
+        try:
+            results = search(timeout)
+        except Exception as exc:
+            if str(exc) == _NO_RESULTS:
+                search_health.record(site, time.monotonic() - started, ok=True)
+                s["results"] = 0
+                return None
+            if not (cut_short and isinstance(exc, TimeoutException)):
+                search_health.record(
+                    site, time.monotonic() - started, ok=False, blocked=isinstance(exc, RatelimitException)
+                )
+            raise
+        search_health.record(site, time.monotonic() - started, ok=True)
+        s["results"] = len(results)
+        return results
+
+
+def _refresh_in_background(key: tuple, search, site: str):
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def _refresh():
         try:
-            results = DDGS().text(f"{query} site:{domain}", max_results=results_per_domain)
-            return _parse_results(results)
+            # Background refreshes aren't on anyone's clock; use the default timeout
+            results = _run_search(site, search, None)
+            if results is not None:
+                _cache.set(key, results)
         except Exception:
-            return []
+            pass
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    _refresh_pool.submit(_refresh)
+
+
+async def asearch_whitelisted(
+    query: str, domains: list[str], max_results: int = 20, timeout: int | None = None
+) -> list[dict]:
+    """Async wrapper for search_whitelisted (DDGS is sync-only, so it runs on the shared search pool)."""
+    return await asyncio.wrap_future(submit(search_pool, search_whitelisted, query, domains, max_results, timeout))
 
-    with ThreadPoolExecutor(max_workers=len(domains)) as pool:
-        all_results = list(pool.map(_search_one, domains))
 
-    combined = []
-    for batch in all_results:
-        combined.extend(batch)
-    return [r for r in combined if _is_whitelisted(r["url"], domains)]
+async def asearch_domain(
+    query: str, domain: str, max_results: int = 3, timeout: int | None = None
+) -> list[dict]:
+    """Async wrapper for search_domain."""
+    return await asyncio.wrap_future(submit(search_pool, search_domain, query, domain, max_results, timeout))
 
 
 def _parse_results(results: list) -> list[dict]:
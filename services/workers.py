@@ -0,0 +1,117 @@
+"""Process-wide worker pools and admission control for the query pipeline.
+
+Every query's searches run on search_pool and its page fetches on
+fetch_pool, so the thread count stays fixed however many sessions are
+searching. Admitted streaming queries run their pipeline on answer_pool,
+one thread per active query. The pools' queues stay bounded because only admitted queries
+submit work, each with a bounded number of tasks in flight, and a query
+cancels its queued tasks when it is done with them.
+
+    with admission.admit():
+        ...run the pipeline...
+
+admit() lets MAX_ACTIVE_QUERIES queries run at once. Later ones queue (in
+arrival order) for up to ADMISSION_WAIT seconds; once MAX_QUEUED_QUERIES are
+waiting, or a wait runs out, BusyError is raised so the UI can ask the kid
+to try again in a moment.
+"""
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+
+from config import ADMISSION_WAIT, FETCH_WORKERS, MAX_ACTIVE_QUERIES, MAX_QUEUED_QUERIES, SEARCH_WORKERS
+from services.telemetry import span
+
+search_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+answer_pool = ThreadPoolExecutor(max_workers=MAX_ACTIVE_QUERIES, thread_name_prefix="answer")
+
+
+class BusyError(Exception):
+    """Too many queries are running or waiting; the caller should try again shortly."""
+
+
+class AdmissionControl:
+    def __init__(self, max_active: int, max_queued: int, max_wait: float):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiting: deque[Future] = deque()
+
+    @contextmanager
+    def admit(self):
+        """Hold one query slot for the duration of the block."""
+        with span("admission") as s:
+            ticket = self._enter()
+            s["queued"] = ticket is not None
+            if ticket is not None:
+                try:
+                    ticket.result(timeout=self.max_wait)
+                except TimeoutError:
+                    if self._withdraw(ticket):
+                        raise BusyError("timed out waiting for a query slot") from None
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aadmit(self):
+        """Async variant of admit(); waiting doesn't block the event loop."""
+        with span("admission") as s:
+            ticket = self._enter()
+            s["queued"] = ticket is not None
+            if ticket is not None:
+                try:
+                    await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(ticket)), self.max_wait)
+                except TimeoutError:
+                    if self._withdraw(ticket):
+                        raise BusyError("timed out waiting for a query slot") from None
+                except asyncio.CancelledError:
+                    if not self._withdraw(ticket):
+                        self._release()
+                    raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def load(self) -> tuple[int, int]:
+        """(running, waiting) query counts."""
+        with self._lock:
+            return self._active, len(self._waiting)
+
+    def _enter(self) -> Future | None:
+        """Take a slot (returns None) or a place in the queue (returns its ticket)."""
+        with self._lock:
+            if self._active < self.max_active and not self._waiting:
+                self._active += 1
+                return None
+            if len(self._waiting) >= self.max_queued:
+                raise BusyError(f"{self._active} queries running and {len(self._waiting)} waiting")
+            ticket = Future()
+            self._waiting.append(ticket)
+            return ticket
+
+    def _withdraw(self, ticket: Future) -> bool:
+        """Leave the queue; False if the ticket was granted a slot in the meantime."""
+        with self._lock:
+            if ticket.done():
+                return False
+            self._waiting.remove(ticket)
+            return True
+
+    def _release(self):
+        with self._lock:
+            if self._waiting:
+                # Hand the slot straight to the longest-waiting query
+                self._waiting.popleft().set_result(None)
+            else:
+                self._active -= 1
+
+
+admission = AdmissionControl(MAX_ACTIVE_QUERIES, MAX_QUEUED_QUERIES, ADMISSION_WAIT)
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from google import genai
+
+from services.gemini_scheduler import ANSWER, SOURCE_SUMMARIES, GeminiScheduler
+
+# Input tokens per minute; the flash bucket refills ten times faster
+QUOTAS = {"pro": (1000, 300), "flash": (1000, 1200)}
+CONFIG = genai.types.GenerateContentConfig()
+
+
+def _client(served: list):
+    """Fake client that records each prompt it is sent."""
+
+    def generate_content(model, contents, config):
+        served.append(contents)
+        return SimpleNamespace(usage_metadata=None)
+
+    return SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+
+
+def _drain(scheduler: GeminiScheduler, model: str):
+    """Spend the model's whole token bucket."""
+    tpm = QUOTAS[model][1]
+    scheduler.generate(_client([]), model, "x" * tpm * 4, CONFIG, ANSWER, timeout=1)
+
+
+def _queue(scheduler: GeminiScheduler, client, model: str, label: str, priority: int) -> threading.Thread:
+    thread = threading.Thread(
+        target=scheduler.generate, args=(client, model, label, CONFIG, priority, 5),
+    )
+    thread.start()
+    # Let the call reach the scheduler's queue before the next one arrives
+    time.sleep(0.05)
+    return thread
+
+
+def _serve(scheduler: GeminiScheduler, *calls) -> list:
+    served = []
+    client = _client(served)
+    threads = [_queue(scheduler, client, *call) for call in calls]
+    for thread in threads:
+        thread.join()
+    return served
+
+
+def test_answer_goes_before_source_summaries_for_another_model():
+    scheduler = GeminiScheduler(QUOTAS, max_retries=0)
+    _drain(scheduler, "pro")
+    _drain(scheduler, "flash")
+
+    # flash has room again after ~0.2s, pro only after ~0.6s
+    served = _serve(scheduler, ("flash", "summaries", SOURCE_SUMMARIES), ("pro", "answer", ANSWER))
+
+    assert served == ["answer", "summaries"]
+
+
+def test_answer_goes_before_source_summaries_for_the_same_model():
+    scheduler = GeminiScheduler(QUOTAS, max_retries=0)
+    _drain(scheduler, "pro")
+
+    served = _serve(scheduler, ("pro", "summaries", SOURCE_SUMMARIES), ("pro", "answer", ANSWER))
+
+    assert served == ["answer", "summaries"]
+
+
+def _async_client(served: list):
+    async def generate_content(model, contents, config):
+        served.append(contents)
+        return SimpleNamespace(usage_metadata=None)
+
+    return SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+
+
+def test_async_answer_goes_before_source_summaries():
+    scheduler = GeminiScheduler(QUOTAS, max_retries=0)
+    _drain(scheduler, "pro")
+    _drain(scheduler, "flash")
+    served = []
+
+    async def main():
+        client = _async_client(served)
+        summaries = asyncio.create_task(
+            scheduler.agenerate(client, "flash", "summaries", CONFIG, SOURCE_SUMMARIES, timeout=5)
+        )
+        await asyncio.sleep(0.05)
+        await scheduler.agenerate(client, "pro", "answer", CONFIG, ANSWER, timeout=5)
+        await summaries
+
+    asyncio.run(main())
+
+    assert served == ["answer", "summaries"]
+
+
+def test_cancelled_async_call_leaves_the_queue():
+    scheduler = GeminiScheduler(QUOTAS, max_retries=0)
+    _drain(scheduler, "pro")
+    served = []
+
+    async def main():
+        answer = asyncio.create_task(
+            scheduler.agenerate(_async_client(served), "pro", "answer", CONFIG, ANSWER, timeout=5)
+        )
+        await asyncio.sleep(0.05)
+        answer.cancel()
+        await asyncio.gather(answer, return_exceptions=True)
+        # Nothing is waiting any more, so the flash call doesn't have to yield
+        started = time.monotonic()
+        await scheduler.agenerate(_async_client(served), "flash", "summaries", CONFIG, SOURCE_SUMMARIES, timeout=5)
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) < 0.1
+    assert served == ["summaries"]
@@ -0,0 +1,181 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+
+class _Stop(BaseException):
+    """Stands in for the leader being interrupted (KeyboardInterrupt, a closed generator, ...)."""
+
+
+def _wait_for(predicate, timeout: float = 2.0):
+    give_up_at = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < give_up_at, "timed out"
+        time.sleep(0.01)
+
+
+def _run_followers(flight: SingleFlight, fn, count: int) -> list:
+    """Start a leader, then `count` followers once the leader is inside fn; returns their outcomes."""
+    outcomes = [None] * (count + 1)
+
+    def call(i):
+        try:
+            outcomes[i] = flight.do("key", fn)
+        except Exception as exc:
+            outcomes[i] = exc
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count + 1)]
+    threads[0].start()
+    _wait_for(lambda: fn.calls)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    fn.release.set()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def _gated(result=None, error: BaseException | None = None):
+    """fn that blocks until released, then returns result or raises error."""
+
+    def fn():
+        fn.calls += 1
+        fn.release.wait()
+        if error is not None:
+            raise error
+        return result
+
+    fn.calls = 0
+    fn.release = threading.Event()
+    return fn
+
+
+def test_followers_share_the_leaders_result():
+    fn = _gated(result={"answer": 42})
+
+    outcomes = _run_followers(SingleFlight(), fn, 3)
+
+    assert fn.calls == 1
+    assert [shared for _, shared in outcomes] == [False, True, True, True]
+    assert all(result is outcomes[0][0] for result, _ in outcomes)
+
+
+def test_followers_share_the_leaders_exception():
+    error = ValueError("boom")
+    fn = _gated(error=error)
+
+    outcomes = _run_followers(SingleFlight(), fn, 2)
+
+    assert fn.calls == 1
+    assert all(outcome is error for outcome in outcomes)
+
+
+def test_followers_start_over_when_the_leader_is_abandoned():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(threading.current_thread().name)
+        if len(calls) == 1:
+            release.wait()
+            raise _Stop()
+        return "fresh"
+
+    def leader():
+        with pytest.raises(_Stop):
+            flight.do("key", fn)
+
+    leading = threading.Thread(target=leader, name="leader")
+    leading.start()
+    _wait_for(lambda: calls)
+    outcome = []
+    following = threading.Thread(target=lambda: outcome.append(flight.do("key", fn)), name="follower")
+    following.start()
+    time.sleep(0.05)
+    release.set()
+    leading.join()
+    following.join()
+
+    assert calls == ["leader", "follower"]
+    assert outcome == [("fresh", False)]
+
+
+def test_async_followers_share_the_leaders_result():
+    flight = SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        return await asyncio.gather(*[flight.ado("key", fn) for _ in range(3)])
+
+    assert asyncio.run(main()) == [("done", False), ("done", True), ("done", True)]
+    assert calls == [1]
+
+
+def test_stream_replays_earlier_items_to_a_late_joiner():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def produce():
+        yield 1
+        yield 2
+        release.wait()
+        yield 3
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        first, shared = flight.stream("key", executor, produce)
+        assert not shared
+        assert [next(first), next(first)] == [1, 2]
+
+        late, shared = flight.stream("key", executor, produce)
+        assert shared
+        release.set()
+
+        assert list(late) == [1, 2, 3]
+        assert list(first) == [3]
+
+
+def test_stream_raises_the_producers_exception_to_every_caller():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def produce():
+        yield "partial"
+        release.wait()
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        first, _ = flight.stream("key", executor, produce)
+        late, _ = flight.stream("key", executor, produce)
+        release.set()
+
+        for items in (first, late):
+            assert next(items) == "partial"
+            with pytest.raises(ValueError):
+                next(items)
+
+
+def test_stream_leader_failing_before_iteration_drops_the_flight():
+    flight = SingleFlight()
+
+    def refuse():
+        raise ValueError("busy")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with pytest.raises(ValueError):
+            flight.stream("key", executor, refuse)
+        items, shared = flight.stream("key", executor, lambda: iter([1]))
+
+        assert not shared
+        assert list(items) == [1]
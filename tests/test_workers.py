@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+from contextlib import ExitStack
+
+import pytest
+
+from services.workers import AdmissionControl, BusyError
+
+
+def _wait_for(predicate, timeout: float = 2.0):
+    give_up_at = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < give_up_at, "timed out"
+        time.sleep(0.01)
+
+
+def _hold(admission: AdmissionControl) -> ExitStack:
+    """Take a slot until the returned stack is closed."""
+    slot = ExitStack()
+    slot.enter_context(admission.admit())
+    return slot
+
+
+def test_queued_queries_are_admitted_in_arrival_order():
+    admission = AdmissionControl(max_active=1, max_queued=3, max_wait=5)
+    admitted = []
+
+    def query(i):
+        with admission.admit():
+            admitted.append(i)
+
+    slot = _hold(admission)
+    threads = []
+    for i in range(3):
+        threads.append(threading.Thread(target=query, args=(i,)))
+        threads[-1].start()
+        _wait_for(lambda: admission.load() == (1, i + 1))
+    slot.close()
+    for thread in threads:
+        thread.join()
+
+    assert admitted == [0, 1, 2]
+    assert admission.load() == (0, 0)
+
+
+def test_busy_when_the_queue_is_full():
+    admission = AdmissionControl(max_active=1, max_queued=1, max_wait=5)
+    slot = _hold(admission)
+
+    def query():
+        with admission.admit():
+            pass
+
+    waiter = threading.Thread(target=query)
+    waiter.start()
+    _wait_for(lambda: admission.load() == (1, 1))
+
+    started = time.monotonic()
+    with pytest.raises(BusyError):
+        with admission.admit():
+            pass
+
+    assert time.monotonic() - started < 0.5
+    slot.close()
+    waiter.join()
+
+
+def test_busy_when_the_wait_runs_out():
+    admission = AdmissionControl(max_active=1, max_queued=1, max_wait=0.1)
+    slot = _hold(admission)
+
+    with pytest.raises(BusyError):
+        with admission.admit():
+            pass
+
+    assert admission.load() == (1, 0)
+    slot.close()
+    assert admission.load() == (0, 0)
+
+
+def test_released_slot_goes_straight_to_the_longest_waiting_query():
+    admission = AdmissionControl(max_active=1, max_queued=2, max_wait=5)
+    done = threading.Event()
+    admitted = threading.Event()
+
+    def waiter():
+        with admission.admit():
+            admitted.set()
+            done.wait()
+
+    slot = _hold(admission)
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    _wait_for(lambda: admission.load() == (1, 1))
+    slot.close()
+
+    # The slot was handed over, not freed: a newcomer still has to queue
+    assert admitted.wait(1)
+    assert admission.load() == (1, 0)
+    admission.max_wait = 0.05
+    with pytest.raises(BusyError):
+        with admission.admit():
+            pass
+    done.set()
+    thread.join()
+    assert admission.load() == (0, 0)
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    admission = AdmissionControl(max_active=1, max_queued=2, max_wait=5)
+
+    async def waiter():
+        async with admission.aadmit():
+            pass
+
+    async def main():
+        slot = _hold(admission)
+        task = asyncio.create_task(waiter())
+        await asyncio.sleep(0.05)
+        assert admission.load() == (1, 1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert admission.load() == (1, 0)
+        slot.close()
+
+    asyncio.run(main())
+
+    assert admission.load() == (0, 0)